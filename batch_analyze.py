@@ -0,0 +1,278 @@
+# batch_analyze.py
+"""Headless batch analysis of job descriptions.
+
+Reads a directory of .txt/.md files or a JSONL file ({"id": ..., "job_description": ...}
+per line), analyzes every posting with a bounded worker pool and streams one JSON result
+per line to the output file. The output doubles as the checkpoint: re-running with the
+same output skips ids that already succeeded and retries the ones that failed.
+
+    python batch_analyze.py postings.jsonl results.jsonl --workers 8
+    python batch_analyze.py postings/ results.jsonl --mode breakdown --workflow-bundle apps.zip
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import gemini_client
+from job_analysis import ANALYSIS_PROMPT, BREAKDOWN_PROMPT, parse_analysis, parse_response
+from workflow_codegen import write_workflow_bundle
+
+MODES = {
+    "analysis": ANALYSIS_PROMPT,
+    "breakdown": BREAKDOWN_PROMPT,
+}
+
+
+def iter_job_descriptions(source):
+    """Yield (id, job_description) pairs lazily from a directory or a JSONL file
+
+    A posting that cannot be read (bad encoding, malformed JSON line) yields the
+    exception in place of its text, so the caller can record it and carry on.
+    """
+    if os.path.isdir(source):
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                if name.endswith((".txt", ".md")):
+                    path = os.path.join(root, name)
+                    try:
+                        with open(path, encoding="utf-8") as f:
+                            text = f.read()
+                    except (OSError, UnicodeDecodeError) as e:
+                        text = e
+                    yield os.path.relpath(path, source), text
+        return
+    with open(source, encoding="utf-8", errors="replace") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield str(line_number), e
+                continue
+            text = record.get("job_description") or record.get("text") or ""
+            yield str(record.get("id", line_number)), text
+
+
+def count_job_descriptions(source):
+    if os.path.isdir(source):
+        return sum(1 for _, _, files in os.walk(source) for name in files if name.endswith((".txt", ".md")))
+    with open(source, encoding="utf-8", errors="replace") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def load_checkpoint(output):
+    """Ids that already have a successful result in the output file"""
+    done = set()
+    if not os.path.exists(output):
+        return done
+    with open(output, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A torn last line from an interrupted run; repair_output drops it before appending
+                continue
+            if not record.get("error"):
+                done.add(record["id"])
+    return done
+
+
+def repair_output(output, block_size=65536):
+    """End the output file with a newline so appended records never join a torn last line
+
+    An interrupted run can leave a partial record without its newline. It is cut off,
+    and its id is redone; a last record that is complete but lost only its newline is
+    kept and terminated.
+    """
+    if not os.path.exists(output):
+        return
+    with open(output, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        if end == 0:
+            return
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            return
+        # Walk back to the start of the last line
+        start = end
+        while start > 0:
+            size = min(block_size, start)
+            f.seek(start - size)
+            block = f.read(size)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                start = start - size + newline + 1
+                break
+            start -= size
+        f.seek(start)
+        try:
+            json.loads(f.read(end - start).decode("utf-8"))
+        except ValueError:
+            f.truncate(start)
+        else:
+            f.write(b"\n")
+
+
+def failed_record(job_id, mode, exception, elapsed=0.0):
+    """Result line for a posting that raised; it is retried on the next run like an API error"""
+    return {
+        "id": job_id,
+        "mode": mode,
+        "analysis": {},
+        "error": f"Error: {type(exception).__name__}: {exception}",
+        "raw": None,
+        "elapsed": round(elapsed, 3),
+    }
+
+
+def analyze_one(api_key, mode, job_id, job_description):
+    started = time.perf_counter()
+    try:
+        raw = gemini_client.analyze(api_key, MODES[mode], job_description)
+        if mode == "analysis":
+            sections, error = parse_response(raw)
+        else:
+            sections = parse_analysis(raw)
+            error = raw if raw.startswith("Error") else None
+    except Exception as e:
+        # One bad posting or reply must not abort the whole batch
+        return failed_record(job_id, mode, e, time.perf_counter() - started)
+    return {
+        "id": job_id,
+        "mode": mode,
+        "analysis": dict(sections),
+        "error": error,
+        "raw": raw,
+        "elapsed": round(time.perf_counter() - started, 3),
+    }
+
+
+def iter_breakdowns(output):
+    """(name, analysis) for every successful breakdown result in an output file
+
+    Names are the ids made path-safe. An id that had to be changed gets a short hash
+    of the original, so "a/b" and "a_b" stay apart; any remaining clash, including
+    names differing only in case, gets a counter.
+    """
+    seen = set()
+    with open(output, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("mode") == "breakdown" and not record.get("error"):
+                job_id = record["id"]
+                name = re.sub(r"[^\w.-]+", "_", job_id)
+                if name != job_id:
+                    name = f"{name}_{hashlib.sha1(job_id.encode('utf-8')).hexdigest()[:8]}"
+                unique, counter = name, 1
+                while unique.lower() in seen:
+                    counter += 1
+                    unique = f"{name}_{counter}"
+                seen.add(unique.lower())
+                yield unique, record["analysis"]
+
+
+class Progress:
+    def __init__(self, total, skipped, interval=5.0, stream=sys.stderr):
+        self.total = total
+        self.skipped = skipped
+        self.interval = interval
+        self.stream = stream
+        self.done = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+        self.last_report = self.started
+
+    def update(self, record):
+        self.done += 1
+        if record["error"]:
+            self.failed += 1
+        now = time.perf_counter()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self.report()
+
+    def report(self, final=False):
+        elapsed = time.perf_counter() - self.started
+        rate = self.done / elapsed if elapsed else 0.0
+        remaining = self.total - self.skipped - self.done if self.total is not None else None
+        eta = f", eta {remaining / rate:.0f}s" if rate and remaining else ""
+        label = "done" if final else "progress"
+        total = self.total if self.total is not None else "?"
+        print(f"[{label}] {self.done + self.skipped}/{total} ({self.skipped} from checkpoint, "
+              f"{self.failed} failed) {rate:.2f} jobs/s{eta}", file=self.stream, flush=True)
+
+
+def run(source, output, api_key, mode="analysis", workers=4, progress_interval=5.0):
+    repair_output(output)
+    done = load_checkpoint(output)
+    total = count_job_descriptions(source)
+    progress = Progress(total, skipped=0, interval=progress_interval)
+    pending = set()
+
+    with open(output, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=workers) as executor:
+        def write(record):
+            out.write(json.dumps(record) + "\n")
+            progress.update(record)
+
+        def drain(return_when):
+            nonlocal pending
+            finished, pending = wait(pending, return_when=return_when)
+            for future in finished:
+                write(future.result())
+            out.flush()
+
+        for job_id, job_description in iter_job_descriptions(source):
+            if job_id in done:
+                progress.skipped += 1
+                continue
+            if isinstance(job_description, Exception):
+                write(failed_record(job_id, mode, job_description))
+                continue
+            # Keep at most 2x workers in flight so huge inputs are never fully queued in memory
+            if len(pending) >= workers * 2:
+                drain(FIRST_COMPLETED)
+            pending.add(executor.submit(analyze_one, api_key, mode, job_id, job_description))
+        while pending:
+            drain(FIRST_COMPLETED)
+
+    progress.report(final=True)
+    return progress
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze many job descriptions without the Streamlit UI")
+    parser.add_argument("source", help="Directory of .txt/.md files or a JSONL file")
+    parser.add_argument("output", help="JSONL file results are appended to (also the resume checkpoint)")
+    parser.add_argument("--mode", choices=sorted(MODES), default="analysis",
+                        help="analysis: job-description-analyzer sections; breakdown: techstacks2toolsv2 breakdown")
+    parser.add_argument("--workers", type=int, default=4, help="Maximum concurrent API calls")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"),
+                        help="Google AI Studio API key (defaults to $GEMINI_API_KEY)")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="Seconds between progress reports")
+    parser.add_argument("--workflow-bundle", help="breakdown mode only: also write a zip with a daily_workflow.py per posting")
+    args = parser.parse_args(argv)
+
+    if not args.api_key:
+        parser.error("an API key is required (--api-key or GEMINI_API_KEY)")
+    if args.workflow_bundle and args.mode != "breakdown":
+        parser.error("--workflow-bundle needs --mode breakdown")
+    progress = run(args.source, args.output, args.api_key, mode=args.mode, workers=args.workers,
+                   progress_interval=args.progress_interval)
+    if args.workflow_bundle:
+        count = write_workflow_bundle(iter_breakdowns(args.output), args.workflow_bundle)
+        print(f"[done] wrote {count} workflow apps to {args.workflow_bundle}", file=sys.stderr)
+    return 1 if progress.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# bench_parse_response.py
+"""Micro-benchmark for job_analysis.parse_response on large synthetic replies.
+
+Compares the keyword-mask classifier against the original per-line keyword
+scans (kept below as legacy_parse_response) and checks both give identical output.
+
+    python benchmarks/bench_parse_response.py --lines 1000 10000 100000
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_analysis import SECTION_KEYWORDS, parse_response  # noqa: E402
+
+
+def legacy_parse_response(response):
+    sections = defaultdict(list)
+    lines = response.split('\n')
+    current_section = None
+
+    if response.startswith("Error:"):
+        return sections, response
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        lower_line = line.lower()
+        if any(lower_line.startswith(f"{i}.") for i in range(1, 6)):
+            if "tasks" in lower_line or "responsibilities" in lower_line:
+                current_section = "Key Tasks and Responsibilities"
+            elif "skills" in lower_line or "required" in lower_line:
+                current_section = "Skills Required"
+            elif "tool" in lower_line or "design" in lower_line:
+                current_section = "Tool Design Overview"
+            elif "tech" in lower_line or "stack" in lower_line or "integration" in lower_line:
+                current_section = "Tech Stack Integration"
+            elif "implementation" in lower_line or "notes" in lower_line:
+                current_section = "Implementation Notes"
+            sections[current_section].append(line.lstrip("12345.").strip())
+        elif current_section:
+            for section, keywords in SECTION_KEYWORDS.items():
+                if any(keyword in lower_line for keyword in keywords) and section != current_section:
+                    current_section = section
+                    break
+            sections[current_section].append(line)
+        else:
+            for section, keywords in SECTION_KEYWORDS.items():
+                if any(keyword in lower_line for keyword in keywords):
+                    current_section = section
+                    sections[current_section].append(line)
+                    break
+
+    if not any(sections.values()):
+        return sections, "Error: Could not extract meaningful sections from the response"
+
+    return sections, None
+
+
+FILLER = ("the candidate will work closely with cross functional partners to deliver reliable "
+          "services and communicate progress clearly to stakeholders every week").split()
+KEYWORDS = [k for keywords in SECTION_KEYWORDS.values() for k in keywords]
+HEADINGS = ["1. Key tasks and responsibilities", "2. Skills required", "3. A brief overview of a tool design",
+            "4. How the tech stack integrates", "5. Notes on implementation"]
+
+
+def synthetic_response(lines, seed=0):
+    rng = random.Random(seed)
+    out = []
+    for i in range(lines):
+        if i % 40 == 0:
+            out.append(HEADINGS[(i // 40) % len(HEADINGS)])
+            continue
+        words = rng.sample(FILLER, 12)
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words)), rng.choice(KEYWORDS))
+        out.append("- " + " ".join(words).capitalize())
+    return "\n".join(out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'lines':>8} {'legacy ms':>11} {'current ms':>12} {'speedup':>8}")
+    for lines in args.lines:
+        response = synthetic_response(lines)
+        legacy_sections, legacy_error = legacy_parse_response(response)
+        sections, error = parse_response(response)
+        assert (dict(legacy_sections), legacy_error) == (dict(sections), error), "outputs differ"
+
+        number = max(1, 20_000 // lines)
+        legacy = min(timeit.repeat(lambda: legacy_parse_response(response), number=number, repeat=args.repeat)) / number
+        current = min(timeit.repeat(lambda: parse_response(response), number=number, repeat=args.repeat)) / number
+        print(f"{lines:>8} {legacy * 1000:>11.2f} {current * 1000:>12.2f} {legacy / current:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
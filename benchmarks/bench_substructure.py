@@ -0,0 +1,135 @@
+# bench_substructure.py
+"""Benchmark for chem_substructure: screen-out rate and query latency.
+
+Builds a throwaway database of random drug-like molecules (or uses --db), then runs a
+set of SMARTS queries through the pattern-fingerprint screen and the parallel exact
+match. A brute-force HasSubstructMatch scan over the whole table is timed for
+comparison and used to check that the screen never drops a real match.
+
+    python benchmarks/bench_substructure.py --molecules 100000
+    python benchmarks/bench_substructure.py --db cheminformatics.db --skip-brute-force
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chem_parallel import map_chunks  # noqa: E402
+from chem_store import MoleculeStore  # noqa: E402
+from chem_substructure import ScreenIndex, SearchStats, fill_missing_screens, substructure_search  # noqa: E402
+
+QUERIES = [
+    "c1ccccc1[OX2H]",        # phenol
+    "C(=O)[OX2H1]",          # carboxylic acid
+    "[NX3][CX3](=O)",        # amide
+    "c1ccncc1",              # pyridine
+    "[#6]S(=O)(=O)[NX3]",    # sulfonamide
+    "C#N",                   # nitrile
+    "[F,Cl,Br,I]",           # any halogen
+    "c1ccc2ccccc2c1",        # naphthalene
+]
+
+FRAGMENTS = ["c1ccccc1", "c1ccncc1", "C1CCNCC1", "C1CCOCC1", "C(=O)N", "C(=O)O", "S(=O)(=O)N",
+             "C#N", "Cl", "F", "Br", "O", "N", "CC", "C(C)C", "OC", "c1ccc2ccccc2c1", "C=O"]
+
+
+def random_molecules(count, seed=0):
+    """Random chains of fragments that RDKit can parse, deduplicated by canonical SMILES"""
+    from rdkit import Chem, RDLogger
+    RDLogger.DisableLog("rdApp.*")
+
+    rng = random.Random(seed)
+    seen = set()
+    while len(seen) < count:
+        smiles = "C" + "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(2, 6)))
+        mol = Chem.MolFromSmiles(smiles)
+        if mol is not None:
+            canonical = Chem.MolToSmiles(mol)
+            if canonical not in seen:
+                seen.add(canonical)
+                yield f"bench_{len(seen)}", canonical, canonical
+
+
+def brute_match_chunk(smarts, rows):
+    """What a search without the screen or stored mols costs: parse and match every row"""
+    from rdkit import Chem
+
+    query = Chem.MolFromSmarts(smarts)
+    matched = []
+    for molecule_id, smiles in rows:
+        mol = Chem.MolFromSmiles(smiles)
+        if mol is not None and mol.HasSubstructMatch(query):
+            matched.append(molecule_id)
+    return matched
+
+
+def iter_all_molecules(store, page_size=50000):
+    last_id = 0
+    while True:
+        with store.connection() as conn:
+            rows = conn.execute("SELECT id, COALESCE(canonical_smiles, smiles) FROM molecules WHERE id > ? "
+                                "ORDER BY id LIMIT ?", (last_id, page_size)).fetchall()
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1][0]
+
+
+def brute_force(store, smarts, workers):
+    """Exact match against every molecule, no screen"""
+    matched = []
+    for chunk in map_chunks(partial(brute_match_chunk, smarts), iter_all_molecules(store), workers, 2000):
+        matched.extend(chunk)
+    return matched
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--molecules", type=int, default=50000, help="Size of the generated database")
+    parser.add_argument("--db", help="Benchmark an existing database instead")
+    parser.add_argument("--workers", type=int, help="Match processes (defaults to the CPU count)")
+    parser.add_argument("--skip-brute-force", action="store_true", help="Do not time the unscreened scan")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        path = args.db or os.path.join(scratch, "bench.db")
+        store = MoleculeStore(path)
+        if not args.db:
+            started = time.perf_counter()
+            with store.transaction() as conn:
+                conn.executemany("INSERT INTO molecules (name, smiles, canonical_smiles) VALUES (?, ?, ?)",
+                                 random_molecules(args.molecules))
+            print(f"generated {args.molecules:,} molecules in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        fill_missing_screens(store, workers=args.workers)
+        index = ScreenIndex.load_or_build(store, os.path.join(scratch, "screen"))
+        print(f"screen index over {len(index):,} molecules ready in {time.perf_counter() - started:.1f}s\n")
+
+        print(f"{'query':24} {'matches':>8} {'candidates':>10} {'screened out':>12} {'screen ms':>9} "
+              f"{'query s':>8} {'brute s':>8}")
+        for smarts in QUERIES:
+            stats = SearchStats(len(index))
+            found = [molecule_id for chunk in substructure_search(store, index, smarts, workers=args.workers,
+                                                                   stats=stats)
+                     for molecule_id in chunk]
+            elapsed = stats.elapsed
+            brute = ""
+            if not args.skip_brute_force:
+                started = time.perf_counter()
+                expected = brute_force(store, smarts, args.workers)
+                brute = f"{time.perf_counter() - started:8.2f}"
+                if sorted(expected) != sorted(found):
+                    raise AssertionError(f"screened search disagrees with brute force for {smarts}")
+            print(f"{smarts:24} {stats.matched:8,} {stats.candidates:10,} {stats.screen_out_rate:12.1%} "
+                  f"{stats.screen_seconds * 1000:9.1f} {elapsed:8.2f} {brute:>8}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
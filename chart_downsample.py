@@ -0,0 +1,96 @@
+# chart_downsample.py
+"""Bound the number of points handed to plotly/matplotlib, whatever the data size.
+
+Time series are reduced with Largest-Triangle-Three-Buckets (LTTB), which keeps the
+peaks and troughs a line chart is read for. Bar and pie charts keep the largest
+categories and fold the rest into "Other". Histograms are binned here with numpy, so
+the figure gets bin counts rather than the raw column.
+
+    df = downsample_series(df, "bucket", "credits_used", by="warehouse_name", budget=2000)
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_POINT_BUDGET = int(os.environ.get("CHART_POINT_BUDGET", 2000))
+
+
+def lttb_indices(x, y, n_out):
+    """Indices of the n_out points of (x, y) chosen by LTTB; x must be sorted ascending"""
+    n = len(x)
+    if n <= n_out:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])[:max(n_out, 0)]
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # n - 2 inner points split into n_out - 2 buckets; the first and last points are always kept
+    every = (n - 2) / (n_out - 2)
+    edges = np.append(np.floor(np.arange(n_out - 1) * every).astype(np.int64) + 1, n)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end, next_end = edges[i], edges[i + 1], edges[i + 2]
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        # Twice the triangle area between the last kept point, each candidate and the next bucket's mean
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def _numeric(values):
+    if values.dtype == object:
+        # SQLite returns timestamps and date buckets as ISO-8601 text
+        parsed = pd.to_datetime(values, errors="coerce")
+        if parsed.notna().all():
+            values = parsed
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype("int64").to_numpy()
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+
+
+def downsample_series(df, x, y, by=None, budget=DEFAULT_POINT_BUDGET):
+    """df reduced to about budget rows of (x, y), split evenly across the lines named by by"""
+    if len(df) <= budget:
+        return df
+    groups = [df] if by is None else [group for _, group in df.groupby(by, sort=False)]
+    per_group = max(budget // len(groups), 3)
+    parts = []
+    for group in groups:
+        group = group.dropna(subset=[x, y]).sort_values(x, kind="stable")
+        parts.append(group.iloc[lttb_indices(_numeric(group[x]), _numeric(group[y]), per_group)])
+    return pd.concat(parts, ignore_index=True)
+
+
+def top_categories(df, category, value, budget=DEFAULT_POINT_BUDGET, other_label="Other"):
+    """The budget largest categories by value; the rest are summed into one other_label row
+
+    Pass other_label=None for measures that do not add up (averages, percentages);
+    the remaining categories are then dropped instead of summed.
+    """
+    totals = df.groupby(category, sort=False, dropna=False)[value].sum()
+    if len(totals) <= budget:
+        return df
+    keep = budget - 1 if other_label is not None else budget
+    ranked = totals.sort_values(ascending=False)
+    top = ranked.iloc[:keep]
+    if other_label is not None:
+        top = pd.concat([top, pd.Series({other_label: ranked.iloc[keep:].sum()})])
+    return top.rename_axis(category).reset_index(name=value)
+
+
+def histogram_bins(values, bins=20, budget=DEFAULT_POINT_BUDGET):
+    """(counts, edges) of a numeric column with at most budget bins, NaNs ignored"""
+    values = pd.to_numeric(pd.Series(values), errors="coerce").dropna().to_numpy(dtype=float)
+    return np.histogram(values, bins=max(1, min(int(bins), budget)))
+
+
+def value_counts(values, budget=DEFAULT_POINT_BUDGET, other_label="Other"):
+    """Frequency table of a categorical column, capped at budget rows"""
+    counts = pd.Series(values).value_counts(dropna=False).rename_axis("value").reset_index(name="count")
+    counts["value"] = counts["value"].astype(str)
+    return top_categories(counts, "value", "count", budget, other_label)
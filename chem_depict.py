@@ -0,0 +1,133 @@
+# chem_depict.py
+"""Cache of rendered structure depictions.
+
+Depictions are keyed by (canonical SMILES, width, height, format) and held as encoded
+PNG bytes or SVG text in a byte-bounded LRU. An optional directory acts as a second,
+persistent tier, so a restarted app does not redraw structures it has drawn before.
+
+    depictions = DepictionCache(directory=".depictions")
+    st.image(depictions.depict("c1ccccc1O"))
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+FORMATS = ("png", "svg")
+
+
+def render(mol, size=(300, 300), fmt="png"):
+    """PNG bytes or SVG text for mol"""
+    if fmt == "svg":
+        from rdkit.Chem.Draw import rdMolDraw2D
+
+        drawer = rdMolDraw2D.MolDraw2DSVG(*size)
+        rdMolDraw2D.PrepareAndDrawMolecule(drawer, mol)
+        drawer.FinishDrawing()
+        return drawer.GetDrawingText()
+    from rdkit.Chem import Draw
+
+    buffer = io.BytesIO()
+    Draw.MolToImage(mol, size=size).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class DepictionCache:
+    """Thread-safe LRU of rendered depictions with an optional on-disk tier"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], f"{digest}.{key[3]}")
+
+    def _remember(self, key, data):
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        return data.decode("utf-8") if key[3] == "svg" else data
+
+    def _write_disk(self, key, data):
+        if not self.directory:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so a concurrent reader never sees a half-written file
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data.encode("utf-8") if isinstance(data, str) else data)
+        os.replace(temp_path, path)
+
+    def depict(self, smiles=None, mol=None, size=(300, 300), fmt="png"):
+        """Depiction of a molecule given as SMILES or an RDKit mol; None if it does not parse"""
+        from rdkit import Chem
+
+        if fmt not in FORMATS:
+            raise ValueError(f"fmt must be one of {FORMATS}")
+        if mol is None:
+            mol = Chem.MolFromSmiles(smiles) if smiles else None
+            if mol is None:
+                return None
+        key = (Chem.MolToSmiles(mol), size[0], size[1], fmt)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+        data = self._read_disk(key)
+        if data is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            data = render(mol, size, fmt)
+            self._write_disk(key, data)
+        self._remember(key, data)
+        return data
+
+    def depict_many(self, molecules, size=(300, 300), fmt="png"):
+        """Depictions for a sequence of SMILES strings or mols, in order"""
+        return [self.depict(mol=item, size=size, fmt=fmt) if not isinstance(item, str)
+                else self.depict(item, size=size, fmt=fmt) for item in molecules]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+            }
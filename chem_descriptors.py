@@ -0,0 +1,134 @@
+# chem_descriptors.py
+"""Persisted molecular descriptors for the molecules table.
+
+molecule_descriptors holds one row per molecule id. fill_missing_descriptors computes
+whatever is missing in bulk across a process pool, so it serves both the initial
+backfill and the incremental update after new molecules are added.
+"""
+from chem_parallel import map_chunks
+
+DESCRIPTOR_COLUMNS = ["mol_wt", "logp", "hbd", "hba"]
+DESCRIPTOR_LABELS = {
+    "mol_wt": "Molecular Weight",
+    "logp": "LogP",
+    "hbd": "H-bond Donors",
+    "hba": "H-bond Acceptors",
+}
+
+
+def compute_descriptors(mol):
+    from rdkit.Chem import Descriptors, rdMolDescriptors
+
+    return (Descriptors.MolWt(mol), Descriptors.MolLogP(mol),
+            rdMolDescriptors.CalcNumHBD(mol), rdMolDescriptors.CalcNumHBA(mol))
+
+
+def descriptor_chunk(rows):
+    """Worker: [(molecule id, smiles)] -> [(molecule id, mol_wt, logp, hbd, hba)]"""
+    from rdkit import Chem
+
+    results = []
+    for molecule_id, smiles in rows:
+        mol = Chem.MolFromSmiles(smiles) if smiles else None
+        # Unparseable rows still get a (NULL) row so they are not retried forever
+        results.append((molecule_id,) + (compute_descriptors(mol) if mol else (None,) * 4))
+    return results
+
+
+def analyze_chunk(smiles_list):
+    """Worker: [smiles] -> [(smiles, canonical smiles or None, mol_wt, logp, hbd, hba)]"""
+    from rdkit import Chem
+
+    results = []
+    for smiles in smiles_list:
+        mol = Chem.MolFromSmiles(smiles)
+        if mol is None:
+            results.append((smiles, None) + (None,) * 4)
+        else:
+            results.append((smiles, Chem.MolToSmiles(mol)) + compute_descriptors(mol))
+    return results
+
+
+def analyze_smiles(store, smiles_list, workers=None, chunk_size=1000, progress=None):
+    """Descriptors for many SMILES, reusing stored ones; rows come back in input order
+
+    Each row is (smiles, canonical smiles, in database, mol_wt, logp, hbd, hba); the
+    canonical SMILES is None for input that does not parse. Input that is already a
+    stored canonical SMILES is answered from molecule_descriptors without RDKit; only
+    the rest is parsed and computed, in a process pool. progress, if given, is called
+    with (done, total) after every chunk.
+    """
+    if not smiles_list:
+        return []
+    total = len(smiles_list)
+    stored = lookup_descriptors(store, smiles_list)
+    known = {smiles: (smiles, *values) for smiles, values in stored.items()}
+    misses = [smiles for smiles in dict.fromkeys(smiles_list) if smiles not in known]
+    done = sum(1 for smiles in smiles_list if smiles in known)
+    if progress:
+        progress(done, total)
+    if len(misses) <= chunk_size:
+        # Not worth starting a process pool for a single chunk
+        chunks = iter([analyze_chunk(misses)] if misses else [])
+    else:
+        chunks = map_chunks(analyze_chunk, misses, workers, chunk_size)
+    computed = {}
+    for chunk in chunks:
+        for smiles, canonical, *values in chunk:
+            computed[smiles] = (canonical, *values)
+        if progress:
+            # Unique misses computed so far; repeated input lines are only counted once until the end
+            progress(min(total, done + len(computed)), total)
+    # Misses may still be stored under their canonical spelling; those keep the stored values
+    stored.update(lookup_descriptors(store, [row[0] for row in computed.values() if row[0] is not None]))
+    rows = []
+    for smiles in smiles_list:
+        canonical, *values = known.get(smiles) or computed[smiles]
+        if canonical in stored:
+            values = stored[canonical]
+        rows.append((smiles, canonical, canonical in stored, *values))
+    if progress:
+        progress(total, total)
+    return rows
+
+
+def store_descriptors(conn, rows):
+    conn.executemany(
+        "INSERT OR REPLACE INTO molecule_descriptors (molecule_id, mol_wt, logp, hbd, hba) VALUES (?, ?, ?, ?, ?)",
+        rows)
+
+
+def fill_missing_descriptors(store, workers=None, chunk_size=2000, batch_size=50000, progress=None):
+    """Compute and store descriptors for every molecule that has none; returns the count"""
+    done = 0
+    batch = []
+    for results in map_chunks(descriptor_chunk, store.iter_missing("molecule_descriptors"), workers, chunk_size):
+        batch.extend(results)
+        if len(batch) >= batch_size:
+            with store.transaction() as conn:
+                store_descriptors(conn, batch)
+            done += len(batch)
+            batch = []
+            if progress:
+                progress(done)
+    if batch:
+        with store.transaction() as conn:
+            store_descriptors(conn, batch)
+        done += len(batch)
+    return done
+
+
+def lookup_descriptors(store, canonical_smiles, chunk=500):
+    """Stored descriptors by canonical SMILES: {canonical: (mol_wt, logp, hbd, hba)}"""
+    found = {}
+    unique = list(dict.fromkeys(canonical_smiles))
+    with store.connection() as conn:
+        for start in range(0, len(unique), chunk):
+            part = unique[start:start + chunk]
+            placeholders = ",".join("?" * len(part))
+            for row in conn.execute(
+                    f'''SELECT m.canonical_smiles, d.mol_wt, d.logp, d.hbd, d.hba FROM molecules m
+                        JOIN molecule_descriptors d ON d.molecule_id = m.id
+                        WHERE m.canonical_smiles IN ({placeholders}) AND d.mol_wt IS NOT NULL''', part):
+                found[row[0]] = row[1:]
+    return found
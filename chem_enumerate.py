@@ -0,0 +1,207 @@
+# chem_enumerate.py
+"""Combinatorial R-group enumeration around a core with attachment points.
+
+The core marks its attachment points with mapped dummy atoms ([*:1], [*:2], ...) and
+each point gets a library of fragment SMILES carrying one dummy atom. Products are
+built with Chem.molzip in worker processes, sanitized, filtered on descriptors and
+deduplicated by canonical SMILES in the parent. Combinations are generated lazily
+and results stream back, so a library of 10^6 virtual compounds never has to sit in
+memory; only an 8-byte hash of each product kept is.
+
+    core = "[*:1]c1ccc([*:2])cc1"
+    libraries = {1: ["[*]C", "[*]OC", "[*]Cl"], 2: ["[*]C(=O)O", "[*]C#N"]}
+    for smiles, descriptors in enumerate_library(core, libraries, limit=1000):
+        ...
+"""
+import hashlib
+import itertools
+import re
+import time
+from functools import lru_cache, partial
+
+from chem_descriptors import DESCRIPTOR_COLUMNS, compute_descriptors
+from chem_parallel import map_chunks
+
+ATTACHMENT_PATTERN = re.compile(r"\[\*:(\d+)\]")
+DEFAULT_FRAGMENTS = ["[*]C", "[*]C=O", "[*]C#N", "[*]Cl", "[*]O", "[*]N"]
+# Lipinski's rule of five as (min, max) per descriptor; None leaves that side open
+RULE_OF_FIVE = {"mol_wt": (None, 500), "logp": (None, 5), "hbd": (None, 5), "hba": (None, 10)}
+
+
+def attachment_points(core_smiles):
+    """Sorted attachment point numbers in a core SMILES"""
+    return sorted({int(number) for number in ATTACHMENT_PATTERN.findall(core_smiles)})
+
+
+def open_positions(base_smiles):
+    """One core per symmetry-unique atom that carries a hydrogen, marked [*:1] there
+
+    Lets a plain SMILES with no attachment points be used for single-site enumeration.
+    """
+    from rdkit import Chem
+
+    mol = Chem.MolFromSmiles(base_smiles)
+    if mol is None:
+        raise ValueError(f"Invalid SMILES: {base_smiles}")
+    cores = []
+    seen_ranks = set()
+    for atom, rank in zip(mol.GetAtoms(), Chem.CanonicalRankAtoms(mol, breakTies=False)):
+        if atom.GetTotalNumHs() == 0 or rank in seen_ranks:
+            continue
+        seen_ranks.add(rank)
+        editable = Chem.RWMol(mol)
+        dummy = editable.AddAtom(Chem.Atom(0))
+        editable.GetAtomWithIdx(dummy).SetAtomMapNum(1)
+        editable.AddBond(atom.GetIdx(), dummy, Chem.BondType.SINGLE)
+        target = editable.GetAtomWithIdx(atom.GetIdx())
+        target.SetNoImplicit(False)
+        if target.GetNumExplicitHs():
+            target.SetNumExplicitHs(target.GetNumExplicitHs() - 1)
+        cores.append(Chem.MolToSmiles(editable))
+    return cores
+
+
+def read_library(text):
+    """Fragment SMILES from text, one per line with an optional name after whitespace
+
+    A fragment without a dummy atom is attached through its first atom.
+    """
+    fragments = []
+    for line in text.splitlines():
+        fields = line.split()
+        if not fields or fields[0].startswith("#"):
+            continue
+        fragments.append(fields[0] if "*" in fields[0] else "[*]" + fields[0])
+    return fragments
+
+
+@lru_cache(maxsize=1024)
+def _core(smiles):
+    from rdkit import Chem
+
+    return Chem.MolFromSmiles(smiles)
+
+
+@lru_cache(maxsize=65536)
+def _fragment(smiles, point):
+    """Parsed fragment with its dummy atom mapped to the attachment point; cached per worker"""
+    from rdkit import Chem
+
+    mol = Chem.MolFromSmiles(smiles)
+    if mol is None:
+        return None
+    dummies = [atom for atom in mol.GetAtoms() if atom.GetAtomicNum() == 0]
+    if len(dummies) != 1:
+        return None
+    dummies[0].SetAtomMapNum(point)
+    return mol
+
+
+def passes(descriptors, filters):
+    for column, (low, high) in filters.items():
+        value = descriptors[DESCRIPTOR_COLUMNS.index(column)]
+        if (low is not None and value < low) or (high is not None and value > high):
+            return False
+    return True
+
+
+def enumerate_chunk(points, filters, combinations):
+    """Worker: [(core, fragment per point)] -> (kept [(canonical, descriptors)], invalid, filtered)"""
+    from rdkit import Chem
+
+    kept = []
+    invalid = filtered = 0
+    for core_smiles, fragments in combinations:
+        core = _core(core_smiles)
+        parts = [_fragment(smiles, point) for smiles, point in zip(fragments, points)]
+        if core is None or any(part is None for part in parts):
+            invalid += 1
+            continue
+        combined = parts[0]
+        for part in parts[1:]:
+            combined = Chem.CombineMols(combined, part)
+        try:
+            product = Chem.molzip(core, combined)
+            Chem.SanitizeMol(product)
+        except Exception:
+            invalid += 1
+            continue
+        descriptors = compute_descriptors(product)
+        if not passes(descriptors, filters):
+            filtered += 1
+            continue
+        kept.append((Chem.MolToSmiles(product), descriptors))
+    return kept, invalid, filtered
+
+
+class EnumerationReport:
+    def __init__(self, total=None):
+        self.total = total
+        self.generated = 0
+        self.invalid = 0
+        self.filtered = 0
+        self.duplicates = 0
+        self.kept = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def __str__(self):
+        total = f" of {self.total:,}" if self.total is not None else ""
+        return (f"{self.generated:,}{total} combinations, {self.kept:,} kept, {self.duplicates:,} duplicates, "
+                f"{self.filtered:,} filtered, {self.invalid:,} invalid in {self.elapsed:.1f}s")
+
+
+def library_size(cores, libraries):
+    size = len(cores)
+    for fragments in libraries.values():
+        size *= len(fragments)
+    return size
+
+
+def enumerate_library(core, libraries, filters=None, workers=None, chunk_size=2000, limit=None, report=None):
+    """Yield (canonical SMILES, descriptors) for every unique product passing filters
+
+    core is a SMILES with [*:n] attachment points, or a list of such cores that share
+    them. libraries maps each attachment point number to a list of fragment SMILES.
+    filters maps descriptor columns to (min, max). Stops after limit products.
+    """
+    cores = [core] if isinstance(core, str) else list(core)
+    points = attachment_points(cores[0])
+    if not points:
+        raise ValueError("The core has no [*:n] attachment points")
+    missing = [point for point in points if not libraries.get(point)]
+    if missing:
+        raise ValueError(f"No fragments for attachment point(s) {', '.join(map(str, missing))}")
+    report = report if report is not None else EnumerationReport()
+    report.total = library_size(cores, {point: libraries[point] for point in points})
+
+    combinations = ((core_smiles, fragments) for core_smiles in cores
+                    for fragments in itertools.product(*(libraries[point] for point in points)))
+    chunk = partial(enumerate_chunk, tuple(points), dict(filters or {}))
+    if report.total <= chunk_size:
+        # Not worth starting a process pool for a single chunk (the default library is 6 products)
+        results = iter([chunk(list(combinations))])
+    else:
+        results = map_chunks(chunk, combinations, workers, chunk_size)
+    seen = set()
+    try:
+        for kept, invalid, filtered in results:
+            report.generated += len(kept) + invalid + filtered
+            report.invalid += invalid
+            report.filtered += filtered
+            for smiles, descriptors in kept:
+                digest = hashlib.blake2b(smiles.encode("utf-8"), digest_size=8).digest()
+                if digest in seen:
+                    report.duplicates += 1
+                    continue
+                seen.add(digest)
+                report.kept += 1
+                yield smiles, descriptors
+                if limit is not None and report.kept >= limit:
+                    return
+    finally:
+        if hasattr(results, "close"):
+            results.close()
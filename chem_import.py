@@ -0,0 +1,260 @@
+# chem_import.py
+"""Bulk import of SMILES, CSV and SDF files into the molecules table.
+
+Records are read lazily, canonicalized with RDKit across a process pool and written
+with executemany in large transactions. Duplicates (same canonical SMILES, in the file
+or already stored) are skipped by the unique index on molecules.canonical_smiles;
+rows stored before that column existed are canonicalized first so they count too.
+
+    python chem_import.py vendor_catalog.sdf.gz --rejects rejects.csv
+"""
+import argparse
+import csv
+import gzip
+import os
+import sys
+import time
+from itertools import chain
+
+from chem_descriptors import fill_missing_descriptors
+from chem_parallel import map_chunks
+from chem_similarity import fill_missing_fingerprints
+from chem_store import DEFAULT_DB_PATH, MoleculeStore
+from chem_substructure import fill_missing_screens
+
+SMILES_COLUMNS = ("smiles", "SMILES", "Smiles", "canonical_smiles")
+NAME_COLUMNS = ("name", "Name", "NAME", "id", "ID", "compound_id")
+
+
+def open_text(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace", newline="")
+
+
+def detect_format(path):
+    name = path[:-3] if path.endswith(".gz") else path
+    extension = os.path.splitext(name)[1].lower()
+    if extension in (".sdf", ".sd", ".mol"):
+        return "sdf"
+    if extension in (".csv", ".tsv"):
+        return "csv"
+    return "smiles"
+
+
+def iter_smiles_file(lines):
+    """'SMILES [name]' per line, as in .smi files"""
+    for line_number, line in enumerate(lines, 1):
+        fields = line.split(None, 1)
+        if not fields or fields[0].startswith("#"):
+            continue
+        name = fields[1].strip() if len(fields) > 1 else ""
+        yield line_number, name, "smiles", fields[0]
+
+
+def iter_csv_file(lines, delimiter=","):
+    reader = csv.DictReader(lines, delimiter=delimiter)
+    smiles_column = next((c for c in SMILES_COLUMNS if c in (reader.fieldnames or [])), None)
+    if smiles_column is None:
+        raise ValueError(f"No SMILES column found; expected one of {', '.join(SMILES_COLUMNS)}")
+    name_column = next((c for c in NAME_COLUMNS if c in reader.fieldnames), None)
+    for row in reader:
+        name = (row.get(name_column) or "") if name_column else ""
+        # line_num counts physical lines, header included, so it matches what an editor shows
+        yield reader.line_num, name, "smiles", (row.get(smiles_column) or "").strip()
+
+
+def iter_sdf_file(lines):
+    """Split an SD file into molblocks without parsing them; the workers do that"""
+    block = []
+    start = 1
+    for line_number, line in enumerate(lines, 1):
+        if line.startswith("$$$$"):
+            if block:
+                yield start, block[0].strip(), "molblock", "".join(block)
+            block = []
+            start = line_number + 1
+        else:
+            block.append(line)
+    if any(line.strip() for line in block):
+        yield start, block[0].strip(), "molblock", "".join(block)
+
+
+def iter_records(path, file_format=None):
+    """Yield (line number, name, kind, payload) lazily from a molecule file"""
+    file_format = file_format or detect_format(path)
+    with open_text(path) as lines:
+        if file_format == "sdf":
+            yield from iter_sdf_file(lines)
+        elif file_format == "csv":
+            yield from iter_csv_file(lines, delimiter="\t" if ".tsv" in path else ",")
+        else:
+            yield from iter_smiles_file(lines)
+
+
+def canonicalize_chunk(records):
+    """Worker: (line, name, kind, payload) -> (line, name, source smiles, canonical or None, payload)"""
+    from rdkit import Chem
+
+    results = []
+    for line_number, name, kind, payload in records:
+        if kind == "molblock":
+            mol = Chem.MolFromMolBlock(payload)
+        else:
+            mol = Chem.MolFromSmiles(payload) if payload else None
+        if mol is None:
+            results.append((line_number, name, None, None, payload if kind == "smiles" else name))
+            continue
+        canonical = Chem.MolToSmiles(mol)
+        results.append((line_number, name, payload if kind == "smiles" else canonical, canonical, None))
+    return results
+
+
+def backfill_canonical(store, workers=None, chunk_size=2000, batch_size=50000):
+    """Fill canonical_smiles for rows stored before the column existed; returns rows updated
+
+    A legacy row whose canonical SMILES is already taken (a duplicate stored earlier) or
+    that does not parse keeps NULL; the partial index keeps rescanning those cheap.
+    """
+    records = ((molecule_id, "", "smiles", smiles) for molecule_id, smiles in store.iter_uncanonical())
+    first = next(records, None)
+    if first is None:
+        # The usual case once a database has been backfilled; no worker pool is started
+        return 0
+    records = chain([first], records)
+    updated = 0
+    pending = []
+
+    def flush():
+        nonlocal updated
+        with store.transaction() as conn:
+            updated += conn.executemany("UPDATE OR IGNORE molecules SET canonical_smiles = ? WHERE id = ?",
+                                        pending).rowcount
+        pending.clear()
+
+    for results in map_chunks(canonicalize_chunk, records, workers, chunk_size):
+        pending.extend((canonical, molecule_id) for molecule_id, _, _, canonical, _ in results if canonical)
+        if len(pending) >= batch_size:
+            flush()
+    if pending:
+        flush()
+    return updated
+
+
+class ImportReport:
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.backfilled = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self):
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        backfilled = f", {self.backfilled:,} legacy rows canonicalized" if self.backfilled else ""
+        return (f"{self.read:,} read, {self.inserted:,} inserted, {self.duplicates:,} duplicates, "
+                f"{self.rejected:,} rejected{backfilled} in {self.elapsed:.1f}s ({self.rate:,.0f} records/s)")
+
+
+def import_file(store, path, file_format=None, workers=None, chunk_size=2000, batch_size=50000,
+                rejects_path=None, progress=None):
+    """Import a SMILES/CSV/SDF file into store; returns an ImportReport
+
+    progress, if given, is called with the report after every committed batch.
+    """
+    report = ImportReport()
+    # Legacy rows have no canonical SMILES, so the unique index could not catch re-imports of them
+    report.backfilled = backfill_canonical(store, workers, chunk_size, batch_size)
+    rejects_file = open(rejects_path, "w", newline="", encoding="utf-8") if rejects_path else None
+    rejects = csv.writer(rejects_file) if rejects_file else None
+    if rejects:
+        rejects.writerow(["line", "name", "input", "reason"])
+    pending_rows = []
+
+    def flush():
+        if not pending_rows:
+            return
+        with store.transaction() as conn:
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO molecules (name, smiles, canonical_smiles) VALUES (?, ?, ?)", pending_rows)
+            inserted = cursor.rowcount
+        report.inserted += inserted
+        report.duplicates += len(pending_rows) - inserted
+        pending_rows.clear()
+        if progress:
+            progress(report)
+
+    def collect(results):
+        for line_number, name, smiles, canonical, rejected_input in results:
+            report.read += 1
+            if canonical is None:
+                report.rejected += 1
+                if rejects:
+                    rejects.writerow([line_number, name, rejected_input, "unparseable structure"])
+                continue
+            pending_rows.append((name, smiles, canonical))
+        if len(pending_rows) >= batch_size:
+            flush()
+
+    try:
+        for results in map_chunks(canonicalize_chunk, iter_records(path, file_format), workers, chunk_size):
+            collect(results)
+        flush()
+    finally:
+        if rejects_file:
+            rejects_file.close()
+    return report
+
+
+def import_bytes(store, data, filename, **kwargs):
+    """import_file for an in-memory upload (e.g. st.file_uploader); spills to a temp file"""
+    import tempfile
+
+    # Keep every extension ("catalog.sdf.gz" -> ".sdf.gz") so the format is still detected
+    suffix = "." + os.path.basename(filename).partition(".")[2]
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as handle:
+        handle.write(data)
+        temp_path = handle.name
+    try:
+        return import_file(store, temp_path, **kwargs)
+    finally:
+        os.unlink(temp_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import molecules into the cheminformatics database")
+    parser.add_argument("path", help="SMILES (.smi/.txt), CSV/TSV or SDF file, optionally .gz compressed")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite database path")
+    parser.add_argument("--format", choices=["smiles", "csv", "sdf"], help="Override format detection")
+    parser.add_argument("--workers", type=int, help="Parser processes (defaults to the CPU count)")
+    parser.add_argument("--batch-size", type=int, default=50000, help="Rows per insert transaction")
+    parser.add_argument("--rejects", help="Write rejected records to this CSV file")
+    parser.add_argument("--skip-descriptors", action="store_true",
+                        help="Do not compute descriptors, fingerprints or screening keys for the new molecules")
+    args = parser.parse_args(argv)
+
+    store = MoleculeStore(args.db)
+    report = import_file(store, args.path, file_format=args.format, workers=args.workers,
+                         batch_size=args.batch_size, rejects_path=args.rejects,
+                         progress=lambda r: print(f"[progress] {r}", file=sys.stderr, flush=True))
+    print(f"[done] {report}", file=sys.stderr)
+    if not args.skip_descriptors:
+        count = fill_missing_descriptors(store, workers=args.workers)
+        print(f"[done] computed descriptors for {count:,} molecules", file=sys.stderr)
+        count = fill_missing_fingerprints(store, workers=args.workers)
+        print(f"[done] computed fingerprints for {count:,} molecules", file=sys.stderr)
+        count = fill_missing_screens(store, workers=args.workers)
+        print(f"[done] computed screening keys for {count:,} molecules", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
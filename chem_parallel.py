@@ -0,0 +1,41 @@
+# chem_parallel.py
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+
+def init_worker():
+    from rdkit import RDLogger
+    RDLogger.DisableLog("rdApp.*")
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def map_chunks(func, items, workers=None, chunk_size=2000, initializer=init_worker):
+    """Run func over chunks of items in a process pool, yielding results in input order
+
+    Only a bounded window of chunks is in flight, so items can be a lazy stream of
+    millions of records without being read far ahead of the consumer.
+    """
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer) as executor:
+        in_flight = deque()
+        try:
+            for chunk in chunked(items, chunk_size):
+                if len(in_flight) >= workers * 2:
+                    yield in_flight.popleft().result()
+                in_flight.append(executor.submit(func, chunk))
+            while in_flight:
+                yield in_flight.popleft().result()
+        finally:
+            # A consumer that stops early should not wait for chunks it will never read
+            for future in in_flight:
+                future.cancel()
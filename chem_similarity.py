@@ -0,0 +1,260 @@
+# chem_similarity.py
+"""Morgan fingerprint similarity search over the molecules table.
+
+Fingerprints are stored per molecule in SQLite as packed 2048-bit BLOBs (32 uint64
+words). For searching they are exported to a memory-mapped sidecar directory sorted
+by popcount, where a Tanimoto top-k scan only visits rows whose popcount can still
+beat the current k-th best score: Tanimoto(a, b) <= min(|a|, |b|) / max(|a|, |b|).
+
+Fingerprints are written when molecules are added or imported. Each index build goes
+into a fresh subdirectory that is published by atomically replacing a CURRENT pointer,
+so sessions that still have the previous build memory-mapped are never disturbed.
+
+    index = SimilarityIndex.load_or_build(store)
+    index.search_smiles("c1ccccc1O", k=10)  # -> [(molecule_id, similarity), ...]
+"""
+import json
+import math
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+from chem_parallel import map_chunks
+
+FP_BITS = 2048
+FP_WORDS = FP_BITS // 64
+MORGAN_RADIUS = 2
+
+_generator = None
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _morgan_generator():
+    global _generator
+    if _generator is None:
+        from rdkit.Chem import rdFingerprintGenerator
+        _generator = rdFingerprintGenerator.GetMorganGenerator(radius=MORGAN_RADIUS, fpSize=FP_BITS)
+    return _generator
+
+
+def fingerprint_words(mol):
+    """Morgan fingerprint of mol packed into FP_WORDS little-endian uint64 words"""
+    bits = _morgan_generator().GetFingerprintAsNumPy(mol).astype(np.uint8)
+    return np.packbits(bits).view("<u8")
+
+
+def popcount_rows(words):
+    """Number of set bits in each row of a (n, FP_WORDS) uint64 array"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int64)
+    # numpy < 2.0: byte-wise lookup table
+    return _POPCOUNT8[words.view(np.uint8)].reshape(len(words), -1).sum(axis=1, dtype=np.int64)
+
+
+def fingerprint_chunk(rows):
+    """Worker: [(molecule id, smiles)] -> [(molecule id, popcount, packed fingerprint bytes)]"""
+    from rdkit import Chem
+
+    results = []
+    for molecule_id, smiles in rows:
+        mol = Chem.MolFromSmiles(smiles) if smiles else None
+        if mol is None:
+            results.append((molecule_id, None, None))
+            continue
+        words = fingerprint_words(mol)
+        results.append((molecule_id, int(popcount_rows(words[None, :])[0]), words.tobytes()))
+    return results
+
+
+def store_fingerprints(conn, rows):
+    conn.executemany(
+        "INSERT OR REPLACE INTO molecule_fingerprints (molecule_id, popcount, morgan) VALUES (?, ?, ?)", rows)
+
+
+def fill_missing_fingerprints(store, workers=None, chunk_size=2000, batch_size=50000):
+    """Compute and store fingerprints for every molecule that has none; returns the count"""
+    done = 0
+    batch = []
+
+    def flush():
+        with store.transaction() as conn:
+            store_fingerprints(conn, batch)
+
+    for results in map_chunks(fingerprint_chunk, store.iter_missing("molecule_fingerprints"), workers, chunk_size):
+        batch.extend(results)
+        if len(batch) >= batch_size:
+            flush()
+            done += len(batch)
+            batch = []
+    if batch:
+        flush()
+        done += len(batch)
+    return done
+
+
+def current_index(directory):
+    """Path of the build a sidecar directory's CURRENT pointer names, or None"""
+    try:
+        with open(os.path.join(directory, "CURRENT")) as f:
+            return os.path.join(directory, f.read().strip())
+    except FileNotFoundError:
+        return None
+
+
+def staging_directory(directory):
+    os.makedirs(directory, exist_ok=True)
+    return tempfile.mkdtemp(prefix="build-", dir=directory)
+
+
+def publish_index(directory, staging):
+    """Make a finished staging build the current one; returns its final path
+
+    Older builds are removed, but on POSIX a session that has them memory-mapped
+    keeps reading the unlinked files until it reopens the index.
+    """
+    name = "index-" + os.path.basename(staging)[len("build-"):]
+    path = os.path.join(directory, name)
+    os.replace(staging, path)
+    pointer = os.path.join(directory, f"CURRENT.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(pointer, "w") as f:
+        f.write(name)
+    os.replace(pointer, os.path.join(directory, "CURRENT"))
+    live = {name, os.path.basename(current_index(directory) or "")}
+    for entry in os.listdir(directory):
+        if entry.startswith("index-") and entry not in live:
+            shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+        elif entry.endswith(".npy") or entry == "meta.json":
+            # Files of the single-directory layout used before builds were versioned
+            try:
+                os.unlink(os.path.join(directory, entry))
+            except FileNotFoundError:
+                pass
+    return path
+
+
+class SimilarityIndex:
+    """Memory-mapped fingerprint matrix sorted by popcount"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.ids = np.load(os.path.join(directory, "ids.npy"), mmap_mode="r")
+        self.popcounts = np.load(os.path.join(directory, "popcounts.npy"), mmap_mode="r")
+        self.fingerprints = np.load(os.path.join(directory, "fingerprints.npy"), mmap_mode="r")
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.signature = json.load(f)["signature"]
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def default_directory(store):
+        return os.path.splitext(store.path)[0] + ".fpindex"
+
+    @classmethod
+    def build(cls, store, directory=None):
+        """Export stored fingerprints to a new sidecar build, streaming rows straight into the memmaps"""
+        directory = directory or cls.default_directory(store)
+        staging = staging_directory(directory)
+        with store.connection() as conn:
+            # One read transaction, so the version, row count and rows are the same snapshot
+            conn.execute("BEGIN")
+            signature = conn.execute(
+                "SELECT version FROM table_versions WHERE name = 'molecule_fingerprints'").fetchone()[0]
+            count = conn.execute("SELECT COUNT(*) FROM molecule_fingerprints WHERE morgan IS NOT NULL").fetchone()[0]
+            ids = np.lib.format.open_memmap(os.path.join(staging, "ids.npy"), "w+", np.int64, (count,))
+            popcounts = np.lib.format.open_memmap(os.path.join(staging, "popcounts.npy"), "w+", np.int64, (count,))
+            fingerprints = np.lib.format.open_memmap(os.path.join(staging, "fingerprints.npy"), "w+",
+                                                     np.uint64, (count, FP_WORDS))
+            rows = conn.execute(
+                "SELECT molecule_id, popcount, morgan FROM molecule_fingerprints "
+                "WHERE morgan IS NOT NULL ORDER BY popcount, molecule_id")
+            position = 0
+            while position < count:
+                batch = rows.fetchmany(50000)
+                if not batch:
+                    break
+                end = position + len(batch)
+                ids[position:end] = [row[0] for row in batch]
+                popcounts[position:end] = [row[1] for row in batch]
+                fingerprints[position:end] = np.frombuffer(b"".join(row[2] for row in batch),
+                                                           dtype="<u8").reshape(-1, FP_WORDS)
+                position = end
+        for array in (ids, popcounts, fingerprints):
+            array.flush()
+        del ids, popcounts, fingerprints
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump({"signature": signature, "bits": FP_BITS, "radius": MORGAN_RADIUS}, f)
+        return cls(publish_index(directory, staging))
+
+    @classmethod
+    def load_or_build(cls, store, directory=None, refresh=True):
+        """Open the current sidecar build, rebuilding it when the fingerprint table has changed"""
+        directory = directory or cls.default_directory(store)
+        path = current_index(directory)
+        if path is not None:
+            try:
+                index = cls(path)
+            except FileNotFoundError:
+                # Replaced and cleaned up by another build between reading CURRENT and opening it
+                index = None
+            if index is not None and (not refresh or index.signature == store.table_version("molecule_fingerprints")):
+                return index
+        return cls.build(store, directory)
+
+    def search(self, query_words, k=10, threshold=0.0, block_rows=65536):
+        """Top-k (molecule_id, Tanimoto) pairs for a packed query fingerprint, best first
+
+        Rows are scanned outwards from the query's popcount, one block at a time, always
+        on the side with the higher Tanimoto upper bound. The scan stops once neither side
+        can reach the current k-th best score (or threshold).
+        """
+        query = np.asarray(query_words, dtype=np.uint64)
+        a = int(popcount_rows(query[None, :])[0])
+        if a == 0 or len(self) == 0 or k <= 0:
+            return []
+        popcounts = self.popcounts
+        # Rows outside [a * t, a / t] can never reach the threshold t
+        low = int(np.searchsorted(popcounts, math.ceil(a * threshold), "left")) if threshold > 0 else 0
+        high = int(np.searchsorted(popcounts, math.floor(a / threshold), "right")) if threshold > 0 else len(self)
+        left = right = min(max(int(np.searchsorted(popcounts, a, "left")), low), high)
+
+        def bound(b):
+            return min(a, b) / max(a, b) if b else 0.0
+
+        best_scores = np.empty(0)
+        best_rows = np.empty(0, dtype=np.int64)
+        floor = threshold
+        while left > low or right < high:
+            left_bound = bound(int(popcounts[left - 1])) if left > low else -1.0
+            right_bound = bound(int(popcounts[right])) if right < high else -1.0
+            if max(left_bound, right_bound) < floor:
+                break
+            if right_bound >= left_bound:
+                start, stop = right, min(right + block_rows, high)
+                right = stop
+            else:
+                start, stop = max(left - block_rows, low), left
+                left = start
+            common = popcount_rows(np.bitwise_and(self.fingerprints[start:stop], query))
+            scores = common / (a + popcounts[start:stop] - common)
+            keep = np.nonzero(scores >= threshold)[0]
+            best_scores = np.concatenate([best_scores, scores[keep]])
+            best_rows = np.concatenate([best_rows, keep + start])
+            if len(best_scores) > k:
+                top = np.argpartition(-best_scores, k - 1)[:k]
+                best_scores, best_rows = best_scores[top], best_rows[top]
+            if len(best_scores) == k:
+                floor = max(threshold, float(best_scores.min()))
+        order = np.lexsort((self.ids[best_rows], -best_scores))
+        return [(int(self.ids[best_rows[i]]), float(best_scores[i])) for i in order]
+
+    def search_smiles(self, smiles, k=10, threshold=0.0):
+        from rdkit import Chem
+
+        mol = Chem.MolFromSmiles(smiles)
+        if mol is None:
+            raise ValueError(f"Invalid SMILES: {smiles}")
+        return self.search(fingerprint_words(mol), k=k, threshold=threshold)
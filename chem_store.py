@@ -0,0 +1,270 @@
+# chem_store.py
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DEFAULT_DB_PATH = "cheminformatics.db"
+
+# Applied in order; PRAGMA user_version records how many have run on a database
+MIGRATIONS = [
+    '''
+    CREATE TABLE IF NOT EXISTS molecules (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        smiles TEXT
+    );
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_molecules_name ON molecules (name, id);
+    CREATE INDEX IF NOT EXISTS idx_molecules_smiles ON molecules (smiles, id);
+    CREATE TABLE IF NOT EXISTS molecule_stats (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        row_count INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO molecule_stats (id, row_count) SELECT 1, COUNT(*) FROM molecules;
+    CREATE TRIGGER IF NOT EXISTS molecules_count_insert AFTER INSERT ON molecules
+    BEGIN
+        UPDATE molecule_stats SET row_count = row_count + 1 WHERE id = 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS molecules_count_delete AFTER DELETE ON molecules
+    BEGIN
+        UPDATE molecule_stats SET row_count = row_count - 1 WHERE id = 1;
+    END;
+    ''',
+    '''
+    ALTER TABLE molecules ADD COLUMN canonical_smiles TEXT;
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_molecules_canonical ON molecules (canonical_smiles)
+        WHERE canonical_smiles IS NOT NULL;
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS molecule_descriptors (
+        molecule_id INTEGER PRIMARY KEY,
+        mol_wt REAL,
+        logp REAL,
+        hbd INTEGER,
+        hba INTEGER
+    );
+    CREATE TRIGGER IF NOT EXISTS molecules_descriptors_delete AFTER DELETE ON molecules
+    BEGIN
+        DELETE FROM molecule_descriptors WHERE molecule_id = OLD.id;
+    END;
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS molecule_fingerprints (
+        molecule_id INTEGER PRIMARY KEY,
+        popcount INTEGER,
+        morgan BLOB
+    );
+    CREATE INDEX IF NOT EXISTS idx_fingerprints_popcount ON molecule_fingerprints (popcount, molecule_id);
+    CREATE TRIGGER IF NOT EXISTS molecules_fingerprints_delete AFTER DELETE ON molecules
+    BEGIN
+        DELETE FROM molecule_fingerprints WHERE molecule_id = OLD.id;
+    END;
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS molecule_screens (
+        molecule_id INTEGER PRIMARY KEY,
+        pattern BLOB,
+        mol BLOB
+    );
+    CREATE TRIGGER IF NOT EXISTS molecules_screens_delete AFTER DELETE ON molecules
+    BEGIN
+        DELETE FROM molecule_screens WHERE molecule_id = OLD.id;
+    END;
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_molecules_uncanonical ON molecules (id) WHERE canonical_smiles IS NULL;
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS table_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO table_versions (name, version) VALUES ('molecule_fingerprints', 0);
+    CREATE TRIGGER IF NOT EXISTS fingerprints_version_insert AFTER INSERT ON molecule_fingerprints
+    BEGIN
+        UPDATE table_versions SET version = version + 1 WHERE name = 'molecule_fingerprints';
+    END;
+    CREATE TRIGGER IF NOT EXISTS fingerprints_version_update AFTER UPDATE ON molecule_fingerprints
+    BEGIN
+        UPDATE table_versions SET version = version + 1 WHERE name = 'molecule_fingerprints';
+    END;
+    CREATE TRIGGER IF NOT EXISTS fingerprints_version_delete AFTER DELETE ON molecule_fingerprints
+    BEGIN
+        UPDATE table_versions SET version = version + 1 WHERE name = 'molecule_fingerprints';
+    END;
+    ''',
+    '''
+    INSERT OR IGNORE INTO table_versions (name, version) VALUES ('molecule_screens', 0);
+    CREATE TRIGGER IF NOT EXISTS screens_version_insert AFTER INSERT ON molecule_screens
+    BEGIN
+        UPDATE table_versions SET version = version + 1 WHERE name = 'molecule_screens';
+    END;
+    CREATE TRIGGER IF NOT EXISTS screens_version_update AFTER UPDATE ON molecule_screens
+    BEGIN
+        UPDATE table_versions SET version = version + 1 WHERE name = 'molecule_screens';
+    END;
+    CREATE TRIGGER IF NOT EXISTS screens_version_delete AFTER DELETE ON molecule_screens
+    BEGIN
+        UPDATE table_versions SET version = version + 1 WHERE name = 'molecule_screens';
+    END;
+    ''',
+]
+
+PRAGMAS = {
+    "synchronous": "NORMAL",   # safe with WAL, avoids an fsync per commit
+    "cache_size": -64000,      # negative means KiB, so ~64 MB of page cache per connection
+    "mmap_size": 268435456,    # read through a 256 MB memory map instead of read() calls
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,      # wait for a concurrent writer instead of "database is locked"
+}
+
+SORT_COLUMNS = ("id", "name", "smiles")
+
+
+def prefix_upper_bound(prefix):
+    """Smallest string greater than every string starting with prefix"""
+    while prefix and prefix[-1] == chr(0x10FFFF):
+        prefix = prefix[:-1]
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1) if prefix else None
+
+
+class MoleculeStore:
+    """Pool of tuned SQLite connections shared by every session in the process"""
+
+    def __init__(self, path=DEFAULT_DB_PATH, max_idle=8):
+        self.path = path
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+        self._migrate_lock = threading.Lock()
+        self._migrated = False
+        self.migrate()
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        for pragma, value in PRAGMAS.items():
+            conn.execute(f"PRAGMA {pragma}={value}")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; it goes back to the pool afterwards instead of being closed"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._open()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """Connection inside one transaction: committed on success, rolled back on error"""
+        with self.connection() as conn:
+            with conn:
+                yield conn
+
+    def migrate(self):
+        """Bring the schema up to date; runs once per process"""
+        with self._migrate_lock:
+            if self._migrated:
+                return
+            with self.connection() as conn:
+                # WAL is persistent in the database file, so it only needs setting here
+                conn.execute("PRAGMA journal_mode=WAL")
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+                for number, script in enumerate(MIGRATIONS[version:], version + 1):
+                    conn.executescript(f"BEGIN; {script} PRAGMA user_version={number}; COMMIT;")
+            self._migrated = True
+
+    def count_molecules(self):
+        """Total rows, read from the trigger-maintained counter instead of COUNT(*)"""
+        with self.connection() as conn:
+            return conn.execute("SELECT row_count FROM molecule_stats WHERE id = 1").fetchone()[0]
+
+    def table_version(self, table):
+        """Trigger-maintained change counter of a side table; a primary key lookup, no scan"""
+        with self.connection() as conn:
+            row = conn.execute("SELECT version FROM table_versions WHERE name = ?", (table,)).fetchone()
+        return row[0] if row else None
+
+    def browse(self, sort="id", descending=False, name_prefix="", smiles_prefix="", after=None, limit=50):
+        """One page of molecules using keyset pagination
+
+        after is the cursor returned with the previous page, so every page costs an index
+        seek plus limit rows no matter how deep into the table it is. Filters are prefix
+        matches turned into index range scans. Returns (rows, cursor for the next page).
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"sort must be one of {SORT_COLUMNS}")
+        clauses, params = [], []
+        for column, prefix in (("name", name_prefix), ("smiles", smiles_prefix)):
+            if prefix:
+                clauses.append(f"{column} >= ?")
+                params.append(prefix)
+                upper = prefix_upper_bound(prefix)
+                if upper is not None:
+                    clauses.append(f"{column} < ?")
+                    params.append(upper)
+        comparison = "<" if descending else ">"
+        if after is not None:
+            if sort == "id":
+                clauses.append(f"id {comparison} ?")
+                params.append(after[-1])
+            else:
+                clauses.append(f"({sort}, id) {comparison} (?, ?)")
+                params += list(after)
+        direction = "DESC" if descending else "ASC"
+        order = "id " + direction if sort == "id" else f"{sort} {direction}, id {direction}"
+        where = "WHERE " + " AND ".join(clauses) if clauses else ""
+        query = f"SELECT id, name, smiles FROM molecules {where} ORDER BY {order} LIMIT ?"
+        with self.connection() as conn:
+            rows = conn.execute(query, params + [limit]).fetchall()
+        if len(rows) < limit:
+            return rows, None
+        last = rows[-1]
+        return rows, (last[0],) if sort == "id" else (last[SORT_COLUMNS.index(sort)], last[0])
+
+    def iter_missing(self, table, page_size=50000):
+        """(id, smiles) of molecules with no row in a per-molecule side table, in keyset pages
+
+        Each page is read on a fresh borrow, so callers can write results between pages.
+        """
+        last_id = 0
+        while True:
+            with self.connection() as conn:
+                rows = conn.execute(
+                    f'''SELECT m.id, COALESCE(m.canonical_smiles, m.smiles) FROM molecules m
+                        LEFT JOIN {table} t ON t.molecule_id = m.id
+                        WHERE t.molecule_id IS NULL AND m.id > ? ORDER BY m.id LIMIT ?''',
+                    (last_id, page_size)).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last_id = rows[-1][0]
+
+    def iter_uncanonical(self, page_size=50000):
+        """(id, smiles) of molecules stored before canonical_smiles existed, in keyset pages"""
+        last_id = 0
+        while True:
+            with self.connection() as conn:
+                rows = conn.execute(
+                    "SELECT id, smiles FROM molecules WHERE canonical_smiles IS NULL AND id > ? ORDER BY id LIMIT ?",
+                    (last_id, page_size)).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last_id = rows[-1][0]
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
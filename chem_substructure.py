@@ -0,0 +1,235 @@
+# chem_substructure.py
+"""SMARTS substructure search with a pattern-fingerprint screen.
+
+Every molecule gets an RDKit pattern fingerprint (2048 bits packed into 32 uint64
+words). A molecule can only contain the query if it has every bit the query has, so
+the screen is a vectorized (fingerprint & query) == query test over a memory-mapped
+sidecar index. Only the survivors are checked with HasSubstructMatch, across a process
+pool, and matches are yielded as each chunk finishes. Survivors are loaded from RDKit
+binary pickles stored alongside the screen, which is several times faster than
+parsing their SMILES again.
+
+    index = ScreenIndex.load_or_build(store)
+    for molecule_ids in substructure_search(store, index, "c1ccccc1[OX2H]"):
+        ...
+"""
+import json
+import os
+import time
+from functools import partial
+
+import numpy as np
+
+from chem_parallel import map_chunks
+from chem_similarity import current_index, publish_index, staging_directory
+
+SCREEN_BITS = 2048
+SCREEN_WORDS = SCREEN_BITS // 64
+
+
+def pattern_words(mol):
+    """RDKit pattern fingerprint of a molecule or SMARTS query, packed into uint64 words"""
+    from rdkit import Chem, DataStructs
+
+    bits = np.zeros(SCREEN_BITS, dtype=np.uint8)
+    DataStructs.ConvertToNumpyArray(Chem.PatternFingerprint(mol, fpSize=SCREEN_BITS), bits)
+    return np.packbits(bits).view("<u8")
+
+
+def pattern_chunk(rows):
+    """Worker: [(molecule id, smiles)] -> [(molecule id, packed pattern fingerprint, binary mol)]"""
+    from rdkit import Chem
+
+    results = []
+    for molecule_id, smiles in rows:
+        mol = Chem.MolFromSmiles(smiles) if smiles else None
+        if mol is None:
+            results.append((molecule_id, None, None))
+        else:
+            results.append((molecule_id, pattern_words(mol).tobytes(), mol.ToBinary()))
+    return results
+
+
+def store_screens(conn, rows):
+    conn.executemany("INSERT OR REPLACE INTO molecule_screens (molecule_id, pattern, mol) VALUES (?, ?, ?)", rows)
+
+
+def fill_missing_screens(store, workers=None, chunk_size=2000, batch_size=50000):
+    """Compute and store pattern fingerprints for every molecule that has none; returns the count"""
+    done = 0
+    batch = []
+
+    def flush():
+        with store.transaction() as conn:
+            store_screens(conn, batch)
+
+    for results in map_chunks(pattern_chunk, store.iter_missing("molecule_screens"), workers, chunk_size):
+        batch.extend(results)
+        if len(batch) >= batch_size:
+            flush()
+            done += len(batch)
+            batch = []
+    if batch:
+        flush()
+        done += len(batch)
+    return done
+
+
+class ScreenIndex:
+    """Memory-mapped pattern fingerprints in molecule id order"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.ids = np.load(os.path.join(directory, "ids.npy"), mmap_mode="r")
+        self.patterns = np.load(os.path.join(directory, "patterns.npy"), mmap_mode="r")
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.signature = json.load(f)["signature"]
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def default_directory(store):
+        return os.path.splitext(store.path)[0] + ".screenindex"
+
+    @classmethod
+    def build(cls, store, directory=None):
+        """Export stored pattern fingerprints to a new sidecar build, streaming rows into the memmaps"""
+        directory = directory or cls.default_directory(store)
+        staging = staging_directory(directory)
+        with store.connection() as conn:
+            # One read transaction, so the version, row count and rows are the same snapshot
+            conn.execute("BEGIN")
+            signature = conn.execute(
+                "SELECT version FROM table_versions WHERE name = 'molecule_screens'").fetchone()[0]
+            count = conn.execute("SELECT COUNT(*) FROM molecule_screens WHERE pattern IS NOT NULL").fetchone()[0]
+            ids = np.lib.format.open_memmap(os.path.join(staging, "ids.npy"), "w+", np.int64, (count,))
+            patterns = np.lib.format.open_memmap(os.path.join(staging, "patterns.npy"), "w+",
+                                                 np.uint64, (count, SCREEN_WORDS))
+            rows = conn.execute(
+                "SELECT molecule_id, pattern FROM molecule_screens WHERE pattern IS NOT NULL ORDER BY molecule_id")
+            position = 0
+            while position < count:
+                batch = rows.fetchmany(50000)
+                if not batch:
+                    break
+                end = position + len(batch)
+                ids[position:end] = [row[0] for row in batch]
+                patterns[position:end] = np.frombuffer(b"".join(row[1] for row in batch),
+                                                       dtype="<u8").reshape(-1, SCREEN_WORDS)
+                position = end
+        for array in (ids, patterns):
+            array.flush()
+        del ids, patterns
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump({"signature": signature, "bits": SCREEN_BITS}, f)
+        return cls(publish_index(directory, staging))
+
+    @classmethod
+    def load_or_build(cls, store, directory=None, refresh=True):
+        """Open the current sidecar build, rebuilding it when the screen table has changed"""
+        directory = directory or cls.default_directory(store)
+        path = current_index(directory)
+        if path is not None:
+            try:
+                index = cls(path)
+            except FileNotFoundError:
+                # Replaced and cleaned up by another build between reading CURRENT and opening it
+                index = None
+            if index is not None and (not refresh or index.signature == store.table_version("molecule_screens")):
+                return index
+        return cls.build(store, directory)
+
+    def screen(self, query_words, block_rows=262144):
+        """Ids of molecules whose pattern fingerprint contains every bit of the query's"""
+        query = np.asarray(query_words, dtype=np.uint64)
+        # Only the words the query sets can rule anything out
+        words = np.nonzero(query)[0]
+        if len(words) == 0:
+            return np.asarray(self.ids)
+        wanted = query[words]
+        survivors = []
+        for start in range(0, len(self), block_rows):
+            block = self.patterns[start:start + block_rows, words]
+            survivors.append(self.ids[start:start + block_rows][np.all((block & wanted) == wanted, axis=1)])
+        return np.concatenate(survivors) if survivors else np.empty(0, dtype=np.int64)
+
+
+def match_chunk(smarts, rows):
+    """Worker: [(molecule id, binary mol)] -> ids of the molecules that contain the SMARTS query"""
+    from rdkit import Chem
+
+    query = Chem.MolFromSmarts(smarts)
+    return [molecule_id for molecule_id, binary in rows if Chem.Mol(binary).HasSubstructMatch(query)]
+
+
+class SearchStats:
+    def __init__(self, total):
+        self.total = total
+        self.candidates = 0
+        self.matched = 0
+        self.screen_seconds = 0.0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def screen_out_rate(self):
+        return 1 - self.candidates / self.total if self.total else 0.0
+
+    def __str__(self):
+        return (f"{self.matched:,} matches from {self.candidates:,} candidates of {self.total:,} molecules "
+                f"({self.screen_out_rate:.1%} screened out in {self.screen_seconds * 1000:.0f} ms, "
+                f"{self.elapsed:.2f}s total)")
+
+
+def iter_candidate_rows(store, candidate_ids, page_size=500):
+    """(molecule id, binary mol) for the candidate ids, one IN (...) lookup per page"""
+    for start in range(0, len(candidate_ids), page_size):
+        page = [int(molecule_id) for molecule_id in candidate_ids[start:start + page_size]]
+        with store.connection() as conn:
+            rows = conn.execute(
+                f"SELECT molecule_id, mol FROM molecule_screens WHERE molecule_id IN ({','.join('?' * len(page))}) "
+                "ORDER BY molecule_id", page).fetchall()
+        yield from rows
+
+
+def substructure_search(store, index, smarts, workers=None, chunk_size=500, max_results=None, stats=None):
+    """Yield lists of matching molecule ids, in id order, as each chunk of candidates is checked
+
+    stats, if given, is a SearchStats updated as the search runs. Stops early once
+    max_results matches have been yielded.
+    """
+    from rdkit import Chem
+
+    query = Chem.MolFromSmarts(smarts)
+    if query is None:
+        raise ValueError(f"Invalid SMARTS: {smarts}")
+    query.UpdatePropertyCache(strict=False)
+    stats = stats if stats is not None else SearchStats(len(index))
+    stats.total = len(index)
+    screen_started = time.perf_counter()
+    candidates = index.screen(pattern_words(query))
+    stats.screen_seconds = time.perf_counter() - screen_started
+    stats.candidates = len(candidates)
+
+    rows = iter_candidate_rows(store, candidates)
+    if len(candidates) <= chunk_size:
+        # Not worth starting a process pool for a single chunk
+        matches = iter([match_chunk(smarts, list(rows))])
+    else:
+        matches = map_chunks(partial(match_chunk, smarts), rows, workers, chunk_size)
+    try:
+        for matched in matches:
+            if max_results is not None:
+                matched = matched[:max_results - stats.matched]
+            stats.matched += len(matched)
+            if matched:
+                yield matched
+            if max_results is not None and stats.matched >= max_results:
+                return
+    finally:
+        if hasattr(matches, "close"):
+            matches.close()
@@ -1,39 +1,94 @@
 import streamlit as st
 import pandas as pd
+import importlib.util
+import os
 import rdkit
 from rdkit import Chem
-from rdkit.Chem import Draw, Descriptors
-from rdkit.Chem import rdMolDescriptors
 import sqlite3
 
+from chem_depict import DepictionCache
+from chem_descriptors import (DESCRIPTOR_COLUMNS, DESCRIPTOR_LABELS, analyze_smiles, compute_descriptors,
+                              fill_missing_descriptors, store_descriptors)
+from chem_enumerate import (DEFAULT_FRAGMENTS, RULE_OF_FIVE, EnumerationReport, attachment_points,
+                            enumerate_library, open_positions, read_library)
+from chem_import import backfill_canonical, import_bytes
+from chem_similarity import SimilarityIndex, fill_missing_fingerprints, fingerprint_chunk, store_fingerprints
+from chem_store import SORT_COLUMNS, MoleculeStore
+from chem_substructure import (ScreenIndex, SearchStats, fill_missing_screens, pattern_chunk, store_screens,
+                               substructure_search)
+
 # App Title
 st.title("Cheminformatics Data Explorer")
 
 # Sidebar Navigation
 st.sidebar.title("Navigation")
-page = st.sidebar.radio("Select a Task", ["Database Explorer", "Molecular Analysis", "Chemical Space Exploration"])
+page = st.sidebar.radio("Select a Task", ["Database Explorer", "Molecular Analysis", "Similarity Search",
+                                            "Substructure Search", "Chemical Space Exploration"])
 
 # Database connection (Example using SQLite)
-conn = sqlite3.connect("cheminformatics.db")
-cursor = conn.cursor()
-
-# Ensure a sample table exists
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS molecules (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT,
-    smiles TEXT
-)
-''')
-conn.commit()
+# One pooled store per process: schema migration and pragmas run once, not on every rerun
+@st.cache_resource
+def get_store():
+    store = MoleculeStore("cheminformatics.db")
+    # New molecules get canonical SMILES, descriptors, fingerprints and screens as they are added or
+    # imported; this catches rows written by older versions. Canonical SMILES come first, since
+    # descriptor lookups join on them and the other fills read them.
+    backfill_canonical(store)
+    fill_missing_descriptors(store)
+    fill_missing_fingerprints(store)
+    fill_missing_screens(store)
+    return store
+
+store = get_store()
+
+# Rendered structures are shared by every session; DEPICTION_CACHE_DIR adds a persistent tier
+@st.cache_resource
+def get_depictions():
+    return DepictionCache(directory=os.environ.get("DEPICTION_CACHE_DIR"))
+
+depictions = get_depictions()
+structure_format = st.sidebar.radio("Structure images", ["png", "svg"], format_func=str.upper, horizontal=True)
+
+def show_structures(key, smiles_list, per_page=12):
+    """Draw one page of structures at a time, so only the visible ones are ever rendered"""
+    if not smiles_list:
+        return
+    pages = (len(smiles_list) - 1) // per_page + 1
+    page_number = st.number_input("Structure page", 1, pages, key=f"{key}_page") if pages > 1 else 1
+    visible = smiles_list[(page_number - 1) * per_page:page_number * per_page]
+    st.image(depictions.depict_many(visible, fmt=structure_format), caption=visible, width=200)
 
 # 1. Database Explorer
 if page == "Database Explorer":
     st.header("Cheminformatics Database")
 
-    # Display existing data
-    df = pd.read_sql_query("SELECT * FROM molecules", conn)
-    st.dataframe(df)
+    # Browse existing data one page at a time; filters and sorting run in SQLite
+    col1, col2, col3, col4 = st.columns([2, 2, 1, 1])
+    name_filter = col1.text_input("Name starts with")
+    smiles_filter = col2.text_input("SMILES starts with")
+    sort = col3.selectbox("Sort by", SORT_COLUMNS)
+    descending = col4.checkbox("Descending")
+    page_size = st.select_slider("Rows per page", [25, 50, 100, 250], value=50)
+
+    # Stack of keyset cursors, one per page visited; reset whenever the query changes
+    query_key = (name_filter, smiles_filter, sort, descending, page_size)
+    if st.session_state.get("browse_query") != query_key:
+        st.session_state.browse_query = query_key
+        st.session_state.browse_cursors = [None]
+    cursors = st.session_state.browse_cursors
+
+    rows, next_cursor = store.browse(sort=sort, descending=descending, name_prefix=name_filter,
+                                     smiles_prefix=smiles_filter, after=cursors[-1], limit=page_size)
+    st.caption(f"{store.count_molecules():,} molecules in the database · page {len(cursors)}")
+    st.dataframe(pd.DataFrame(rows, columns=["id", "name", "smiles"]), hide_index=True)
+
+    prev_col, next_col = st.columns(2)
+    if prev_col.button("Previous page", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    if next_col.button("Next page", disabled=next_cursor is None):
+        cursors.append(next_cursor)
+        st.rerun()
 
     # Add new molecules
     with st.form("add_molecule"):
@@ -45,67 +100,176 @@ if page == "Database Explorer":
             try:
                 mol = Chem.MolFromSmiles(smiles)
                 if mol:
-                    cursor.execute("INSERT INTO molecules (name, smiles) VALUES (?, ?)", (name, smiles))
-                    conn.commit()
+                    with store.transaction() as conn:
+                        molecule_id = conn.execute(
+                            "INSERT INTO molecules (name, smiles, canonical_smiles) VALUES (?, ?, ?)",
+                            (name, smiles, Chem.MolToSmiles(mol))).lastrowid
+                        store_descriptors(conn, [(molecule_id, *compute_descriptors(mol))])
+                        store_fingerprints(conn, fingerprint_chunk([(molecule_id, smiles)]))
+                        store_screens(conn, pattern_chunk([(molecule_id, smiles)]))
                     st.success(f"Added {name} to the database.")
                 else:
                     st.error("Invalid SMILES notation.")
+            except sqlite3.IntegrityError:
+                st.warning(f"{smiles} is already in the database.")
             except Exception as e:
                 st.error(f"Error adding molecule: {e}")
 
+    # Bulk import
+    with st.expander("Bulk Import"):
+        uploaded = st.file_uploader("SMILES, CSV or SDF file", type=["smi", "txt", "csv", "tsv", "sdf", "sd", "gz"])
+        if uploaded and st.button("Import File"):
+            progress_text = st.empty()
+            report = import_bytes(store, uploaded.getvalue(), uploaded.name,
+                                  progress=lambda r: progress_text.write(f"Imported so far: {r}"))
+            progress_text.write("Computing descriptors and fingerprints for the new molecules...")
+            fill_missing_descriptors(store)
+            fill_missing_fingerprints(store)
+            fill_missing_screens(store)
+            progress_text.empty()
+            st.success(f"Import finished: {report}")
+
 # 2. Molecular Analysis
 elif page == "Molecular Analysis":
     st.header("Molecular Property Calculator")
 
     smiles_input = st.text_area("Enter SMILES string(s)", height=100)
-    
+
     if st.button("Analyze"):
-        smiles_list = smiles_input.split("\n")
-        results = []
-        
-        for smi in smiles_list:
-            smi = smi.strip()
-            mol = Chem.MolFromSmiles(smi)
-            if mol:
-                mol_img = Draw.MolToImage(mol)
-                mol_weight = Descriptors.MolWt(mol)
-                logp = Descriptors.MolLogP(mol)
-                hbd = rdMolDescriptors.CalcNumHBD(mol)
-                hba = rdMolDescriptors.CalcNumHBA(mol)
-                
-                st.subheader(f"Molecule: {smi}")
-                st.image(mol_img, caption="Structure")
-                st.write(f"**Molecular Weight:** {mol_weight}")
-                st.write(f"**LogP:** {logp}")
-                st.write(f"**H-bond Donors:** {hbd}")
-                st.write(f"**H-bond Acceptors:** {hba}")
-            else:
-                st.warning(f"Invalid SMILES: {smi}")
-
-# 3. Chemical Space Exploration
+        smiles_list = [smi.strip() for smi in smiles_input.split("\n") if smi.strip()]
+        progress_bar = st.progress(0.0, text="Analyzing...")
+        # Parsing and descriptors run in worker processes, a chunk at a time
+        rows = analyze_smiles(store, smiles_list, progress=lambda done, total: progress_bar.progress(
+            done / total if total else 1.0, text=f"Analyzed {done:,} of {total:,}"))
+        progress_bar.empty()
+        columns = ["SMILES", "Canonical SMILES", "In Database"] + [DESCRIPTOR_LABELS[c] for c in DESCRIPTOR_COLUMNS]
+        table = pd.DataFrame(rows, columns=columns)
+        # Kept in session state so sorting, downloads and paging through structures need no recompute
+        st.session_state.analysis_invalid = table.loc[table["Canonical SMILES"].isna(), "SMILES"].tolist()
+        st.session_state.analysis_table = table.dropna(subset=["Canonical SMILES"]).reset_index(drop=True)
+
+    if "analysis_table" in st.session_state:
+        table = st.session_state.analysis_table
+        invalid = st.session_state.analysis_invalid
+        st.caption(f"{len(table):,} molecules analyzed, {len(invalid):,} invalid")
+        if invalid:
+            with st.expander(f"Invalid SMILES ({len(invalid):,})"):
+                st.text("\n".join(invalid[:1000]))
+        st.dataframe(table, hide_index=True)
+
+        csv_col, parquet_col = st.columns(2)
+        csv_col.download_button("Download CSV", table.to_csv(index=False), file_name="molecular_analysis.csv",
+                                mime="text/csv")
+        if importlib.util.find_spec("pyarrow") or importlib.util.find_spec("fastparquet"):
+            parquet_col.download_button("Download Parquet", table.to_parquet(index=False),
+                                        file_name="molecular_analysis.parquet",
+                                        mime="application/vnd.apache.parquet")
+
+        if st.checkbox("Show structures"):
+            show_structures("analysis", table["SMILES"].tolist())
+
+# 3. Similarity Search
+elif page == "Similarity Search":
+    st.header("Similarity Search")
+
+    query_smiles = st.text_input("Query SMILES")
+    col1, col2 = st.columns(2)
+    k = col1.number_input("Results", min_value=1, max_value=1000, value=20)
+    threshold = col2.slider("Minimum Tanimoto similarity", 0.0, 1.0, 0.3, 0.05)
+
+    if st.button("Search") and query_smiles:
+        # The memory-mapped index is rebuilt only when the fingerprint table's change counter moved
+        with st.spinner("Updating fingerprint index..."):
+            index = SimilarityIndex.load_or_build(store)
+        try:
+            hits = index.search_smiles(query_smiles, k=int(k), threshold=threshold)
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            st.caption(f"Searched {len(index):,} fingerprints")
+            molecules = {}
+            if hits:
+                with store.connection() as conn:
+                    molecules = {row[0]: row[1:] for row in conn.execute(
+                        f"SELECT id, name, smiles FROM molecules WHERE id IN ({','.join('?' * len(hits))})",
+                        [molecule_id for molecule_id, _ in hits])}
+            st.dataframe(pd.DataFrame(
+                [(molecule_id, *molecules.get(molecule_id, (None, None)), round(score, 3))
+                 for molecule_id, score in hits],
+                columns=["id", "name", "smiles", "Tanimoto"]), hide_index=True)
+
+# 4. Substructure Search
+elif page == "Substructure Search":
+    st.header("Substructure Search")
+
+    smarts = st.text_input("SMARTS query", placeholder="c1ccccc1[OX2H]")
+    max_results = st.number_input("Maximum results", min_value=1, max_value=100000, value=1000)
+
+    if st.button("Search") and smarts:
+        with st.spinner("Updating screening index..."):
+            index = ScreenIndex.load_or_build(store)
+        status = st.empty()
+        table = st.empty()
+        stats = SearchStats(len(index))
+        found = []
+        try:
+            # Matches arrive chunk by chunk from the worker processes; redraw the table as they do
+            for molecule_ids in substructure_search(store, index, smarts, max_results=int(max_results), stats=stats):
+                with store.connection() as conn:
+                    found += conn.execute(
+                        f"SELECT id, name, smiles FROM molecules WHERE id IN ({','.join('?' * len(molecule_ids))}) "
+                        "ORDER BY id", molecule_ids).fetchall()
+                status.caption(f"Searching... {stats}")
+                table.dataframe(pd.DataFrame(found, columns=["id", "name", "smiles"]), hide_index=True)
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            status.caption(str(stats))
+            if not found:
+                table.info("No molecules contain this substructure.")
+
+# 5. Chemical Space Exploration
 elif page == "Chemical Space Exploration":
     st.header("Chemical Space Enumeration")
 
-    base_smiles = st.text_input("Enter Base SMILES for Enumeration")
-    
-    if st.button("Generate Analogues"):
-        mol = Chem.MolFromSmiles(base_smiles)
-        if mol:
-            # Simple enumeration (add common functional groups)
-            fragments = ["CC", "C=O", "C#N", "CCl", "CO", "CN"]
-            new_molecules = []
-
-            for frag in fragments:
-                new_smiles = base_smiles + frag
-                new_mol = Chem.MolFromSmiles(new_smiles)
-                if new_mol:
-                    new_molecules.append((new_smiles, Draw.MolToImage(new_mol)))
-            
-            for smi, img in new_molecules:
-                st.subheader(f"Variant: {smi}")
-                st.image(img, caption=smi)
-        else:
+    base_smiles = st.text_input("Enter Base SMILES for Enumeration",
+                                help="Mark attachment points with [*:1], [*:2], ...; a plain SMILES is "
+                                     "substituted at every open position")
+    points = attachment_points(base_smiles) or [1]
+    libraries = {}
+    for column, point in zip(st.columns(len(points)), points):
+        libraries[point] = read_library(column.text_area(f"R{point} fragments", "\n".join(DEFAULT_FRAGMENTS),
+                                                         height=150, key=f"library_{point}"))
+    col1, col2 = st.columns(2)
+    max_results = col1.number_input("Maximum analogues", min_value=1, max_value=1000000, value=1000)
+    rule_of_five = col2.checkbox("Rule of five only", value=True)
+
+    if st.button("Generate Analogues") and base_smiles:
+        if Chem.MolFromSmiles(base_smiles) is None:
             st.error("Invalid base SMILES notation.")
+            st.stop()
+        try:
+            core = base_smiles if attachment_points(base_smiles) else open_positions(base_smiles)
+            filters = RULE_OF_FIVE if rule_of_five else None
+            report = EnumerationReport()
+            status = st.empty()
+            rows = []
+            # Products stream in from the worker processes; the status line updates as they do
+            for smiles, descriptors in enumerate_library(core, libraries, filters=filters, limit=int(max_results),
+                                                         report=report):
+                rows.append((smiles, *descriptors))
+                if len(rows) % 500 == 0:
+                    status.caption(f"Enumerating... {report}")
+            status.caption(str(report))
+            st.session_state.analogue_table = pd.DataFrame(
+                rows, columns=["SMILES"] + [DESCRIPTOR_LABELS[c] for c in DESCRIPTOR_COLUMNS])
+            st.session_state.analogues = [row[0] for row in rows]
+        except ValueError as e:
+            st.error(str(e))
 
-# Close the database connection
-conn.close()
+    if st.session_state.get("analogues"):
+        st.subheader(f"{len(st.session_state.analogues):,} Variants")
+        st.dataframe(st.session_state.analogue_table, hide_index=True)
+        st.download_button("Download CSV", st.session_state.analogue_table.to_csv(index=False),
+                           file_name="analogues.csv", mime="text/csv")
+        show_structures("analogues", st.session_state.analogues)
@@ -0,0 +1,2 @@
+# conftest.py
+# Lets tests/ import the top-level modules (snowflake_sync, chem_store, ...) without packaging
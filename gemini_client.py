@@ -0,0 +1,245 @@
+# gemini_client.py
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from analysis_cache import AnalysisCache, cache_key
+from rate_limiter import CircuitBreaker, RateLimiter, RetryPolicy, estimate_tokens
+
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+DEFAULT_MODEL = "gemini-2.0-flash"
+
+
+class StreamError(str):
+    """Error message yielded by a stream, distinguishable from reply text"""
+
+
+class GeminiClient:
+    """Gemini REST client backed by a pooled, keep-alive requests.Session"""
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, model=DEFAULT_MODEL, pool_connections=4,
+                 pool_maxsize=16, pool_block=False, timeout=30, cache=None, rate_limiter=None,
+                 circuit_breaker=None, retry_policy=None):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.cache = cache
+        # Shared by every thread using this client, so concurrent sessions and batch
+        # workers draw from one quota
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        # pool_connections is the number of hosts kept alive, pool_maxsize the
+        # number of sockets reused per host
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                              pool_block=pool_block)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def endpoint(self, method="generateContent"):
+        return f"{self.base_url}/models/{self.model}:{method}"
+
+    def generate_content(self, api_key, prompt):
+        payload = {
+            "contents": [{
+                "parts": [{"text": prompt}]
+            }]
+        }
+        data = json.dumps(payload)
+        estimated = estimate_tokens(prompt)
+        attempts = self.retry_policy.max_retries + 1
+        error = "Error: API request failed"
+        for attempt in range(attempts):
+            if not self.circuit_breaker.allow():
+                return "Error: API temporarily unavailable after repeated failures, please retry shortly"
+            self.rate_limiter.acquire(estimated)
+            retry_after = None
+            # Every attempt the breaker let through must report back, or a half-open probe never resolves
+            healthy = False
+            try:
+                response = self.session.post(self.endpoint(), params={"key": api_key},
+                                             data=data, timeout=self.timeout)
+                if response.status_code in RetryPolicy.RETRY_STATUSES:
+                    retry_after = response.headers.get("Retry-After")
+                    if response.status_code == 429:
+                        self.rate_limiter.throttle()
+                response.raise_for_status()
+                result = response.json()
+            except requests.exceptions.Timeout:
+                error = "Error: API request timed out"
+            except (requests.exceptions.ConnectionError, requests.exceptions.HTTPError) as e:
+                error = f"Error calling API: {str(e)}"
+                if e.response is not None and e.response.status_code not in RetryPolicy.RETRY_STATUSES:
+                    # Bad key or bad request: the service is healthy, retrying will not help
+                    healthy = True
+                    return error
+            except requests.exceptions.RequestException as e:
+                return f"Error calling API: {str(e)}"
+            else:
+                healthy = True
+                self.rate_limiter.recover()
+                self.rate_limiter.record_usage(estimated, result.get("usageMetadata", {}).get("totalTokenCount", 0))
+                return result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "No response generated")
+            finally:
+                if healthy:
+                    self.circuit_breaker.record_success()
+                else:
+                    self.circuit_breaker.record_failure()
+            if attempt + 1 < attempts:
+                time.sleep(self.retry_policy.delay(attempt, retry_after))
+        return error
+
+    def stream_content(self, api_key, prompt):
+        """Yield reply text as it arrives from streamGenerateContent (server-sent events)
+
+        A failure is yielded as a StreamError chunk, so callers can keep it apart from
+        the reply text. The generator's return value tells whether the stream completed
+        cleanly. Streams are not retried: a retry after partial output would duplicate text.
+        """
+        payload = {
+            "contents": [{
+                "parts": [{"text": prompt}]
+            }]
+        }
+        if not self.circuit_breaker.allow():
+            yield StreamError("Error: API temporarily unavailable after repeated failures, please retry shortly")
+            return False
+        self.rate_limiter.acquire(estimate_tokens(prompt))
+        received = False
+        # True or False once the service has shown it is healthy or failing; None if the
+        # consumer closed the generator first (a Streamlit rerun does this)
+        healthy = None
+        try:
+            try:
+                with self.session.post(self.endpoint("streamGenerateContent"),
+                                       params={"key": api_key, "alt": "sse"},
+                                       data=json.dumps(payload), timeout=self.timeout, stream=True) as response:
+                    if response.status_code == 429:
+                        self.rate_limiter.throttle()
+                    response.raise_for_status()
+                    for line in response.iter_lines(decode_unicode=True):
+                        if not line or not line.startswith("data:"):
+                            continue
+                        event = json.loads(line[len("data:"):])
+                        for part in event.get("candidates", [{}])[0].get("content", {}).get("parts", []):
+                            if part.get("text"):
+                                received = True
+                                yield part["text"]
+            except requests.exceptions.Timeout:
+                healthy = False
+                error = "Error: API request timed out"
+            except (requests.exceptions.RequestException, ValueError) as e:
+                # Bad key or bad request: the service is healthy
+                failed = getattr(e, "response", None)
+                healthy = failed is not None and failed.status_code not in RetryPolicy.RETRY_STATUSES
+                error = f"Error calling API: {str(e)}"
+            else:
+                healthy = True
+                self.rate_limiter.recover()
+                if not received:
+                    yield "No response generated"
+                return True
+            yield StreamError(error)
+            return False
+        finally:
+            # Every stream the breaker let through must report back, or a half-open probe never
+            # resolves; an abandoned one says nothing about the service, so it only frees the probe
+            if healthy is None:
+                self.circuit_breaker.release()
+            elif healthy:
+                self.circuit_breaker.record_success()
+            else:
+                self.circuit_breaker.record_failure()
+
+    def analyze_stream(self, api_key, template, job_description):
+        """Streaming counterpart of analyze(); a cache hit is yielded as a single chunk
+
+        Errors arrive as StreamError chunks and are never cached with the reply text.
+        """
+        key = cache_key(self.model, template, job_description)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        chunks = []
+        stream = self.stream_content(api_key, template.format(job_description=job_description))
+        try:
+            while True:
+                try:
+                    chunk = next(stream)
+                except StopIteration as stop:
+                    completed = stop.value
+                    break
+                if not isinstance(chunk, StreamError):
+                    chunks.append(chunk)
+                yield chunk
+        finally:
+            stream.close()
+        if self.cache is not None and completed:
+            self.cache.put(key, self.model, "".join(chunks))
+
+    def analyze(self, api_key, template, job_description):
+        """Fill template with the job description, answering from the cache when possible"""
+        key = cache_key(self.model, template, job_description)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        result = self.generate_content(api_key, template.format(job_description=job_description))
+        # Errors are returned as text; never cache them so the next click retries
+        if self.cache is not None and not result.startswith("Error"):
+            self.cache.put(key, self.model, result)
+        return result
+
+    def close(self):
+        self.session.close()
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide client so every app shares one connection pool"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            rate_limiter = RateLimiter(requests_per_minute=int(os.environ.get("GEMINI_RPM", 15)),
+                                       tokens_per_minute=int(os.environ.get("GEMINI_TPM", 1_000_000)))
+            _default_client = GeminiClient(base_url=os.environ.get("GEMINI_BASE_URL", DEFAULT_BASE_URL),
+                                           cache=AnalysisCache(), rate_limiter=rate_limiter)
+        return _default_client
+
+
+def configure(**kwargs):
+    """Replace the shared client, e.g. to point base_url at a local HTTP stand-in"""
+    global _default_client
+    with _default_lock:
+        if _default_client is not None:
+            _default_client.close()
+        _default_client = GeminiClient(**kwargs)
+        return _default_client
+
+
+def generate_content(api_key, prompt):
+    return get_client().generate_content(api_key, prompt)
+
+
+def analyze(api_key, template, job_description):
+    return get_client().analyze(api_key, template, job_description)
+
+
+def analyze_stream(api_key, template, job_description):
+    return get_client().analyze_stream(api_key, template, job_description)
+
+
+def cache_stats():
+    cache = get_client().cache
+    return cache.stats() if cache is not None else None
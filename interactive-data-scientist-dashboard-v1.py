@@ -6,13 +6,41 @@ import plotly.express as px
 from sklearn.model_selection import train_test_split  
 from sklearn.ensemble import RandomForestClassifier  
 from sklearn.metrics import accuracy_score  
-from keras.models import Sequential  
-from keras.layers import Dense  
+
+from chart_downsample import DEFAULT_POINT_BUDGET, histogram_bins, value_counts
+from model_cache import ModelCache, dataset_hash, model_key
 
 # Title and Description  
 st.title("Interactive Data Science Dashboard")  
 st.markdown("This app allows you to explore data, visualize it, and apply Machine Learning models.")  
 
+# --- Model Cache ---
+# Shared by every session; MODEL_CACHE_DIR also keeps trained models on disk (joblib) across restarts
+@st.cache_resource
+def get_model_cache():
+    return ModelCache()
+
+def train_random_forest(df, target_column, n_estimators, test_size, random_state):
+    X = df.drop(columns=[target_column])
+    y = df[target_column]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
+    model = RandomForestClassifier(n_estimators=n_estimators, random_state=random_state)
+    model.fit(X_train, y_train)
+    return model, accuracy_score(y_test, model.predict(X_test))
+
+def build_neural_network(input_dim):
+    # Keras (and its backend) is only imported once a network is actually built
+    from keras.models import Sequential
+    from keras.layers import Dense
+
+    nn_model = Sequential([
+        Dense(64, activation='relu', input_shape=(input_dim,)),
+        Dense(32, activation='relu'),
+        Dense(1, activation='sigmoid')
+    ])
+    nn_model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
+    return nn_model
+
 # File Upload Section  
 uploaded_file = st.file_uploader("Upload your dataset (CSV format)", type=["csv"])  
 
@@ -27,40 +55,51 @@ if uploaded_file:
 
     # Column Selection for Visualization  
     selected_column = st.selectbox("Select a column for visualization", df.columns)  
+    # Binned (or counted) here, so the figure is built from at most point_budget bars, not every row
+    point_budget = st.number_input("Chart point budget", min_value=10, max_value=100000, value=DEFAULT_POINT_BUDGET)
     fig, ax = plt.subplots()  
-    df[selected_column].hist(ax=ax, bins=20)  
+    if pd.api.types.is_numeric_dtype(df[selected_column]):
+        counts, edges = histogram_bins(df[selected_column], bins=20, budget=point_budget)
+        ax.stairs(counts, edges, fill=True)
+    else:
+        counts = value_counts(df[selected_column], budget=point_budget)
+        ax.bar(counts["value"], counts["count"])
+        ax.tick_params(axis="x", labelrotation=90)
     st.pyplot(fig)  
 
     # Machine Learning Model Training  
     st.write("### Train a Machine Learning Model")  
     target_column = st.selectbox("Select the target column", df.columns)  
 
-    X = df.drop(columns=[target_column])  
-    y = df[target_column]  
-
-    # Splitting Data  
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)  
-
-    # Train Random Forest Model  
-    model = RandomForestClassifier(n_estimators=100, random_state=42)  
-    model.fit(X_train, y_train)  
-
-    y_pred = model.predict(X_test)  
-    accuracy = accuracy_score(y_test, y_pred)  
-
-    st.write(f"**Random Forest Model Accuracy:** {accuracy:.2f}")  
+    n_estimators = st.number_input("Number of trees", min_value=10, max_value=1000, value=100, step=10)
+    test_size = st.slider("Test split", min_value=0.1, max_value=0.5, value=0.2, step=0.05)
+
+    # Models are cached by (dataset, target, hyperparameters); other widgets never retrain them
+    model_cache = get_model_cache()
+    data_hash = dataset_hash(df)
+    rf_params = {"model": "random_forest", "n_estimators": int(n_estimators), "test_size": float(test_size),
+                 "random_state": 42}
+    nn_params = {"model": "keras_mlp", "layers": (64, 32, 1), "input_dim": df.shape[1] - 1}
+    rf_key = model_key(data_hash, target_column, rf_params)
+    nn_key = model_key(data_hash, target_column, nn_params)
+
+    if st.button("Train"):
+        with st.spinner("Training..."):
+            model_cache.get_or_train(rf_key, lambda: train_random_forest(
+                df, target_column, rf_params["n_estimators"], rf_params["test_size"], rf_params["random_state"]))
+            model_cache.get_or_train(nn_key, lambda: build_neural_network(nn_params["input_dim"]))
+
+    trained = model_cache.get(rf_key)
+    if trained is None:
+        st.info("Press Train to fit a model for this target and these settings.")
+    else:
+        model, accuracy = trained
+        st.write(f"**Random Forest Model Accuracy:** {accuracy:.2f}")  
 
     # Deep Learning Model  
     st.write("### Build a Neural Network Model")  
 
-    nn_model = Sequential([  
-        Dense(64, activation='relu', input_shape=(X_train.shape[1],)),  
-        Dense(32, activation='relu'),  
-        Dense(1, activation='sigmoid')  
-    ])  
-
-    nn_model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])  
-
-    st.write("Neural network model compiled successfully.")  
+    if model_cache.get(nn_key) is not None:
+        st.write("Neural network model compiled successfully.")  
 
 # Run with: streamlit run app.py  
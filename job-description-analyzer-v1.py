@@ -1,7 +1,7 @@
 import streamlit as st
-import requests
-import json
-from collections import defaultdict
+
+import gemini_client
+from job_analysis import ANALYSIS_PROMPT, SECTION_KEYWORDS, ResponseParser, parse_response
 
 # Set page config as the first Streamlit command
 st.set_page_config(page_title="Job Description Analyzer", layout="wide")
@@ -98,83 +98,57 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 def process_job_description(api_key, job_description):
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
-    headers = {"Content-Type": "application/json"}
-    
-    prompt = f"""Provide a detailed analysis of this job description, covering:
-    1. Key tasks and responsibilities
-    2. Skills required
-    3. A brief overview of a tool design to support the role
-    4. How the tech stack integrates
-    5. Notes on implementation
-    Job Description: {job_description}"""
-
-    payload = {
-        "contents": [{
-            "parts": [{"text": prompt}]
-        }]
-    }
-    try:
-        response = requests.post(url, headers=headers, data=json.dumps(payload), timeout=30)
-        response.raise_for_status()
-        result = response.json()
-        return result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "No response generated")
-    except requests.exceptions.Timeout:
-        return "Error: API request timed out"
-    except requests.exceptions.RequestException as e:
-        return f"Error calling API: {str(e)}"
-
-def parse_response(response):
-    sections = defaultdict(list)
-    lines = response.split('\n')
-    current_section = None
-    
-    section_keywords = {
-        "Key Tasks and Responsibilities": ["tasks", "responsibilities", "duties", "perform"],
-        "Skills Required": ["skills", "required", "qualifications", "abilities"],
-        "Tool Design Overview": ["tool", "design", "overview", "support"],
-        "Tech Stack Integration": ["tech", "stack", "integration", "integrates"],
-        "Implementation Notes": ["implementation", "notes", "how to", "approach"]
-    }
-    
-    if response.startswith("Error:"):
-        return sections, response
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
+    return gemini_client.analyze(api_key, ANALYSIS_PROMPT, job_description)
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def cached_parse_response(response):
+    """parse_response memoized on the reply text so widget reruns skip re-parsing"""
+    return parse_response(response)
+
+def section_placeholders():
+    """Draw the analysis layout and return an empty slot per section to fill in"""
+    st.markdown("### Your Analysis")
+    # Add Business Category and Type
+    with st.container():
+        st.markdown("<div class='section-container'><div class='section-title'>Business Context</div><div class='section-content'>", unsafe_allow_html=True)
+        st.markdown("- **Category**: Technology / HR Tech")
+        st.markdown("- **Type**: Software as a Service (SaaS)")
+        st.markdown("</div></div>", unsafe_allow_html=True)
+
+    # Display the rest of the analysis
+    placeholders = {}
+    for section in SECTION_KEYWORDS:
+        with st.container():
+            st.markdown(f"<div class='section-container'><div class='section-title'>{section}</div><div class='section-content'>", unsafe_allow_html=True)
+            placeholders[section] = st.empty()
+            st.markdown("</div></div>", unsafe_allow_html=True)
+    return placeholders
+
+def render_sections(analysis, placeholders, empty_text="No details identified"):
+    for section, placeholder in placeholders.items():
+        content = "\n".join(f"- {item}" for item in analysis[section]) or empty_text
+        placeholder.markdown(content)
+
+def stream_job_description(api_key, job_description):
+    """Stream the analysis, filling each section live; returns (reply text, stream error or None)"""
+    parser = ResponseParser()
+    placeholders = section_placeholders()
+    stream_error = None
+    for chunk in gemini_client.analyze_stream(api_key, ANALYSIS_PROMPT, job_description):
+        if isinstance(chunk, gemini_client.StreamError):
+            # Kept out of the parsed reply, so it never ends up inside a section
+            stream_error = str(chunk)
             continue
-        
-        lower_line = line.lower()
-        if any(lower_line.startswith(f"{i}.") for i in range(1, 6)):
-            if "tasks" in lower_line or "responsibilities" in lower_line:
-                current_section = "Key Tasks and Responsibilities"
-            elif "skills" in lower_line or "required" in lower_line:
-                current_section = "Skills Required"
-            elif "tool" in lower_line or "design" in lower_line:
-                current_section = "Tool Design Overview"
-            elif "tech" in lower_line or "stack" in lower_line or "integration" in lower_line:
-                current_section = "Tech Stack Integration"
-            elif "implementation" in lower_line or "notes" in lower_line:
-                current_section = "Implementation Notes"
-            sections[current_section].append(line.lstrip("12345.").strip())
-        elif current_section:
-            for section, keywords in section_keywords.items():
-                if any(keyword in lower_line for keyword in keywords) and section != current_section:
-                    current_section = section
-                    break
-            sections[current_section].append(line)
-        else:
-            for section, keywords in section_keywords.items():
-                if any(keyword in lower_line for keyword in keywords):
-                    current_section = section
-                    sections[current_section].append(line)
-                    break
-    
-    if not any(sections.values()):
-        return sections, "Error: Could not extract meaningful sections from the response"
-    
-    return sections, None
+        parser.feed(chunk)
+        render_sections(parser.sections, placeholders, empty_text="...")
+    if stream_error and not parser.text:
+        st.error(stream_error)
+        return stream_error, None
+    analysis, error_message = parser.finish()
+    render_sections(analysis, placeholders)
+    if stream_error or error_message:
+        st.error(stream_error or error_message)
+    return parser.text, stream_error
 
 def main():
     # Main container for centering
@@ -201,37 +175,39 @@ def main():
                     if uploaded_file:
                         job_description = uploaded_file.read().decode("utf-8")
 
+        stream = st.checkbox("Stream results", value=True, help="Show each section as the reply arrives")
+
         # Process Button
+        streamed = False
         if st.button("Analyze Now"):
             if not api_key or not job_description:
                 st.error("Please provide both an API key and a job description.")
+            elif stream:
+                (st.session_state.breakdown_result,
+                 st.session_state.breakdown_error) = stream_job_description(api_key, job_description)
+                streamed = True
             else:
                 with st.spinner("Analyzing..."):
                     st.session_state.breakdown_result = process_job_description(api_key, job_description)
+                    st.session_state.breakdown_error = None
                     st.success("Analysis Complete!")
 
-        # Results Section
-        if "breakdown_result" in st.session_state:
-            analysis, error_message = parse_response(st.session_state.breakdown_result)
+        stats = gemini_client.cache_stats()
+        if stats:
+            st.caption(f"Analysis cache: {stats['hits']} hits / {stats['misses']} misses "
+                       f"({stats['entries']} stored, {stats['size_bytes'] / 1024:.0f} KB)")
+
+        # Results Section (already drawn live when this run streamed them)
+        if "breakdown_result" in st.session_state and not streamed:
+            analysis, error_message = cached_parse_response(st.session_state.breakdown_result)
             
             if error_message:
                 st.error(error_message)
             else:
-                st.markdown("### Your Analysis")
-                # Add Business Category and Type
-                with st.container():
-                    st.markdown("<div class='section-container'><div class='section-title'>Business Context</div><div class='section-content'>", unsafe_allow_html=True)
-                    st.markdown("- **Category**: Technology / HR Tech")
-                    st.markdown("- **Type**: Software as a Service (SaaS)")
-                    st.markdown("</div></div>", unsafe_allow_html=True)
-                
-                # Display the rest of the analysis
-                for section in ["Key Tasks and Responsibilities", "Skills Required", "Tool Design Overview", "Tech Stack Integration", "Implementation Notes"]:
-                    with st.container():
-                        st.markdown(f"<div class='section-container'><div class='section-title'>{section}</div><div class='section-content'>", unsafe_allow_html=True)
-                        content = "\n".join(f"- {item}" for item in analysis[section]) or "No details identified"
-                        st.markdown(content)
-                        st.markdown("</div></div>", unsafe_allow_html=True)
+                render_sections(analysis, section_placeholders())
+            # A stream cut short keeps its partial sections; the error is shown beside them
+            if st.session_state.get("breakdown_error"):
+                st.error(st.session_state.breakdown_error)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,202 @@
+# job_analysis.py
+from bisect import bisect_right
+from collections import defaultdict
+from itertools import accumulate
+
+ANALYSIS_PROMPT = """Provide a detailed analysis of this job description, covering:
+    1. Key tasks and responsibilities
+    2. Skills required
+    3. A brief overview of a tool design to support the role
+    4. How the tech stack integrates
+    5. Notes on implementation
+    Job Description: {job_description}"""
+
+BREAKDOWN_PROMPT = """Analyze this job description and provide a detailed breakdown in the following structured format:
+        - Tools and Tech Stack: [list specific tools/tech mentioned in the job description]
+        - Desired Activities: [list specific activities the employee would perform]
+        - Required Skills: [list specific skills required for the role]
+        Job Description: {job_description}"""
+
+TOOL_DESIGN_PROMPT = "Analyze this job description and suggest a Streamlit tool design to accomplish the tasks described: {job_description}"
+
+BREAKDOWN_MARKER = "=== BREAKDOWN ==="
+TOOL_DESIGN_MARKER = "=== TOOL DESIGN ==="
+
+FUSED_PROMPT = """Analyze this job description and answer in two parts. Start each part with its marker line exactly as shown.
+        """ + BREAKDOWN_MARKER + """
+        Provide a detailed breakdown in the following structured format:
+        - Tools and Tech Stack: [list specific tools/tech mentioned in the job description]
+        - Desired Activities: [list specific activities the employee would perform]
+        - Required Skills: [list specific skills required for the role]
+        """ + TOOL_DESIGN_MARKER + """
+        Suggest a Streamlit tool design to accomplish the tasks described.
+        Job Description: {job_description}"""
+
+SECTION_KEYWORDS = {
+    "Key Tasks and Responsibilities": ["tasks", "responsibilities", "duties", "perform"],
+    "Skills Required": ["skills", "required", "qualifications", "abilities"],
+    "Tool Design Overview": ["tool", "design", "overview", "support"],
+    "Tech Stack Integration": ["tech", "stack", "integration", "integrates"],
+    "Implementation Notes": ["implementation", "notes", "how to", "approach"]
+}
+
+# Words that name the section of a numbered heading ("2. Skills required"), in priority order
+HEADING_KEYWORDS = {
+    "Key Tasks and Responsibilities": ["tasks", "responsibilities"],
+    "Skills Required": ["skills", "required"],
+    "Tool Design Overview": ["tool", "design"],
+    "Tech Stack Integration": ["tech", "stack", "integration"],
+    "Implementation Notes": ["implementation", "notes"]
+}
+
+ERROR_PREFIX = "Error:"
+
+SECTION_NAMES = list(SECTION_KEYWORDS)
+
+def compile_keyword_masks(section_keywords, heading_keywords):
+    """Map each keyword to (bitmask of sections it belongs to, bitmask of headings it selects)
+
+    Bit i stands for the i-th section, so the first matching section in priority order
+    is simply the lowest set bit of the OR of all keywords found in a line.
+    """
+    names = list(section_keywords)
+    masks = {}
+    for table, slot in ((section_keywords, 0), (heading_keywords, 1)):
+        for section, keywords in table.items():
+            for keyword in keywords:
+                if keyword != keyword.strip() or "\n" in keyword:
+                    raise ValueError(f"Keyword {keyword!r} must not start or end with whitespace")
+                pair = masks.setdefault(keyword, [0, 0])
+                pair[slot] |= 1 << names.index(section)
+    return {keyword: tuple(pair) for keyword, pair in masks.items()}
+
+KEYWORD_MASKS = compile_keyword_masks(SECTION_KEYWORDS, HEADING_KEYWORDS)
+NUMBERED_PREFIXES = frozenset(f"{i}." for i in range(1, 6))
+
+def lowest_section(mask):
+    return (mask & -mask).bit_length() - 1
+
+def keyword_masks_by_line(block):
+    """Classify every line of block in one scan per keyword instead of one per line
+
+    Returns per-line section and heading bitmasks. Each keyword is located with
+    str.find over the whole lowercased block and mapped to its line by offset, so
+    Python-level work is proportional to keyword hits rather than lines x keywords.
+    """
+    lower = block.lower()
+    # Offsets are taken in the lowercased text: lower() can change string lengths
+    line_starts = list(accumulate((len(line) + 1 for line in lower.split('\n')), initial=0))
+    section_masks = [0] * (len(line_starts) - 1)
+    heading_masks = [0] * (len(line_starts) - 1)
+    for keyword, (section_mask, heading_mask) in KEYWORD_MASKS.items():
+        position = lower.find(keyword)
+        while position != -1:
+            index = bisect_right(line_starts, position) - 1
+            section_masks[index] |= section_mask
+            heading_masks[index] |= heading_mask
+            # Resume after this line: its masks already include this keyword
+            position = lower.find(keyword, line_starts[index + 1])
+    return section_masks, heading_masks
+
+class ResponseParser:
+    """Incremental parse_response: feed() reply chunks as they stream in, finish() at the end"""
+
+    def __init__(self):
+        self.sections = defaultdict(list)
+        self.current_section = None
+        self.chunks = []
+        self.buffer = ""
+        self.is_error = None
+
+    @property
+    def text(self):
+        return "".join(self.chunks)
+
+    def feed(self, chunk):
+        self.chunks.append(chunk)
+        if self.is_error is None:
+            # Hold everything back until we know whether the reply is an error message
+            head = self.text
+            if len(head) < len(ERROR_PREFIX):
+                return
+            self.is_error = head.startswith(ERROR_PREFIX)
+            self.buffer = head
+        else:
+            self.buffer += chunk
+        if self.is_error:
+            self.buffer = ""
+            return
+        block, newline, self.buffer = self.buffer.rpartition('\n')
+        if newline:
+            self._process_block(block)
+
+    def finish(self):
+        response = self.text
+        if self.is_error is None:
+            self.is_error = response.startswith(ERROR_PREFIX)
+            self.buffer = response
+        if self.is_error:
+            return defaultdict(list), response
+        self._process_block(self.buffer)
+        self.buffer = ""
+
+        if not any(self.sections.values()):
+            return self.sections, "Error: Could not extract meaningful sections from the response"
+
+        return self.sections, None
+
+    def _process_block(self, block):
+        sections = self.sections
+        current_section = self.current_section
+        current_bit = 1 << SECTION_NAMES.index(current_section) if current_section else 0
+        section_masks, heading_masks = keyword_masks_by_line(block)
+        for line, section_mask, heading_mask in zip(block.split('\n'), section_masks, heading_masks):
+            line = line.strip()
+            if not line:
+                continue
+
+            if line[:2] in NUMBERED_PREFIXES:
+                if heading_mask:
+                    current_section = SECTION_NAMES[lowest_section(heading_mask)]
+                    current_bit = heading_mask & -heading_mask
+                sections[current_section].append(line.lstrip("12345.").strip())
+            elif current_section:
+                # Switch to the first other section with a keyword in this line, if any
+                section_mask &= ~current_bit
+                if section_mask:
+                    current_section = SECTION_NAMES[lowest_section(section_mask)]
+                    current_bit = section_mask & -section_mask
+                sections[current_section].append(line)
+            elif section_mask:
+                current_section = SECTION_NAMES[lowest_section(section_mask)]
+                current_bit = section_mask & -section_mask
+                sections[current_section].append(line)
+        self.current_section = current_section
+
+def parse_response(response):
+    parser = ResponseParser()
+    parser.feed(response)
+    return parser.finish()
+
+def parse_analysis(result):
+    sections = {
+        "Tools and Tech Stack": [],
+        "Desired Activities": [],
+        "Required Skills": []
+    }
+    current_section = None
+    for line in result.split('\n'):
+        line = line.strip()
+        if line in sections:
+            current_section = line
+        elif current_section and line.startswith('-') and line[1:].strip():
+            sections[current_section].append(line[1:].strip())
+    return sections
+
+def split_fused_response(result):
+    """Split a fused reply into (breakdown, tool design); falls back to the whole text for both"""
+    _, has_breakdown, rest = result.partition(BREAKDOWN_MARKER)
+    breakdown, has_tool_design, tool_design = rest.partition(TOOL_DESIGN_MARKER)
+    if result.startswith("Error") or not (has_breakdown and has_tool_design):
+        return result, result
+    return breakdown.strip(), tool_design.strip()
@@ -0,0 +1,192 @@
+# model_cache.py
+import hashlib
+import importlib.util
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+DEFAULT_MODEL_DIR = os.environ.get("MODEL_CACHE_DIR")
+
+
+def dataset_hash(df):
+    """Content hash of a DataFrame: column names, dtypes and every cell, including the index"""
+    import pandas as pd
+
+    digest = hashlib.sha256()
+    digest.update(repr([(str(column), str(dtype)) for column, dtype in df.dtypes.items()]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def model_key(data_hash, target, params):
+    """Content address of one trained model: sha256 over (dataset hash, target column, hyperparameters)"""
+    digest = hashlib.sha256()
+    for part in (data_hash, str(target), repr(sorted(params.items()))):
+        data = part.encode("utf-8")
+        # Length-prefix each part so the target and parameters can never run together
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class ModelCache:
+    """Bounded LRU cache of trained models with an optional joblib tier on disk
+
+    At most max_entries models are held in memory. With a directory (and joblib
+    installed) each model is also dumped to disk, keeping the max_disk_entries most
+    recently used, so a restarted app can reload instead of retraining. Concurrent
+    requests for the same key wait for one training run.
+    """
+
+    def __init__(self, max_entries=8, directory=DEFAULT_MODEL_DIR, max_disk_entries=32):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.directory = directory if directory and importlib.util.find_spec("joblib") else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._train_locks = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.joblib")
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+        import joblib
+
+        path = self._path(key)
+        try:
+            value = joblib.load(path)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError, ImportError, AttributeError):
+            # Missing, torn, or pickled by another version of the app or a library (a class that
+            # moved or no longer exists): treat it as a miss and retrain
+            return None
+        self._touch(key)
+        return value
+
+    def _touch(self, key):
+        """Mark key's file as just used; its mtime is the last-used time for pruning"""
+        if not self.directory:
+            return
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            # Pruned by another session, or never written (unpicklable model)
+            pass
+
+    def _write_disk(self, key, value):
+        if not self.directory:
+            return
+        import joblib
+
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            joblib.dump(value, temp_path)
+        except Exception:
+            # Models that cannot be pickled (e.g. some Keras versions) stay memory-only
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            return
+        os.replace(temp_path, path)
+        self._prune_disk()
+
+    def _prune_disk(self):
+        # Sessions share the directory, so any file may vanish under a concurrent prune
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".joblib"):
+                path = os.path.join(self.directory, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except FileNotFoundError:
+                    pass
+        if len(entries) <= self.max_disk_entries:
+            return
+        entries.sort()
+        for _, path in entries[:len(entries) - self.max_disk_entries]:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def get(self, key):
+        """Cached model for key from memory or disk, or None without training"""
+        with self._lock:
+            hit = key in self._entries
+            if hit:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                value = self._entries[key]
+        if hit:
+            # Keep the disk copy's recency in step, so the most used models are pruned last
+            self._touch(key)
+            return value
+        value = self._read_disk(key)
+        if value is not None:
+            self._remember(key, value)
+            with self._lock:
+                self.disk_hits += 1
+        return value
+
+    def get_or_train(self, key, train):
+        """(model, trained) for key, calling train() only when no cached copy exists"""
+        value = self.get(key)
+        if value is not None:
+            return value, False
+        with self._lock:
+            # [lock, waiters]: the entry is dropped once nobody is training or waiting on key
+            entry = self._train_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                # Another session may have trained it while this one waited
+                value = self.get(key)
+                if value is not None:
+                    return value, False
+                value = train()
+                with self._lock:
+                    self.misses += 1
+                self._remember(key, value)
+                self._write_disk(key, value)
+                return value, True
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._train_locks[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.directory:
+            for name in os.listdir(self.directory):
+                if name.endswith(".joblib"):
+                    try:
+                        os.unlink(os.path.join(self.directory, name))
+                    except FileNotFoundError:
+                        pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
@@ -0,0 +1,158 @@
+# rate_limiter.py
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at rate tokens per second"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        """Take amount tokens and return how long the caller must wait before using them"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            # Tokens may go negative: later callers then queue behind this reservation
+            self.tokens -= amount
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def consume(self, amount):
+        """Charge tokens after the fact, e.g. when the real usage exceeded the estimate"""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= amount
+
+    def set_rate(self, rate):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits with AIMD adaptation on 429s"""
+
+    def __init__(self, requests_per_minute=15, tokens_per_minute=1_000_000, min_fraction=0.1, recovery_step=0.05):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.min_fraction = min_fraction
+        self.recovery_step = recovery_step
+        self.fraction = 1.0
+        self.lock = threading.Lock()
+        self.requests = TokenBucket(requests_per_minute / 60.0, requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute)
+
+    def acquire(self, tokens=1):
+        delay = max(self.requests.reserve(1), self.tokens.reserve(min(tokens, self.tokens.capacity)))
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def record_usage(self, estimated, actual):
+        if actual > estimated:
+            self.tokens.consume(actual - estimated)
+
+    def throttle(self):
+        """Halve the request rate after the server pushed back"""
+        with self.lock:
+            self.fraction = max(self.min_fraction, self.fraction / 2)
+            self._apply()
+
+    def recover(self):
+        """Creep back towards the configured rate after each success"""
+        with self.lock:
+            if self.fraction < 1.0:
+                self.fraction = min(1.0, self.fraction + self.recovery_step)
+                self._apply()
+
+    def _apply(self):
+        self.requests.set_rate(self.requests_per_minute * self.fraction / 60.0)
+        self.tokens.set_rate(self.tokens_per_minute * self.fraction / 60.0)
+
+
+class CircuitBreaker:
+    """Stops calls after repeated failures and lets one probe through after reset_timeout"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN and now - self.probe_started >= self.reset_timeout:
+                # The probe never reported back (e.g. its caller died); count it as failed
+                self.state = self.OPEN
+                self.opened_at = now
+            if self.state == self.OPEN:
+                if now - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self.probe_started = now
+                return True
+            # Only one probe is allowed while half-open
+            return self.state == self.CLOSED
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """Report a call that ended without telling anything about the service (e.g. abandoned by its caller)"""
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                # Hand the probe to the next caller straight away, without counting a failure
+                self.state = self.OPEN
+                self.opened_at = time.monotonic() - self.reset_timeout
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, overridden by a server Retry-After header"""
+
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, max_retries=4, base_delay=1.0, max_delay=60.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return min(self.max_delay, max(0.0, float(retry_after)))
+            except ValueError:
+                # HTTP-date form of Retry-After; fall back to our own schedule
+                pass
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English prose
+    return max(1, len(text) // 4)
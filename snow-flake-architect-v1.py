@@ -1,14 +1,24 @@
+import os
+import time
+
 import streamlit as st
 import pandas as pd
 import snowflake.connector
 import plotly.express as px
 
+from chart_downsample import DEFAULT_POINT_BUDGET, downsample_series, top_categories
+from snowflake_cache import QueryCache, query_key
+from snowflake_fetch import fetch_dataframe
+from snowflake_pool import ConnectionPool, Prefetcher
+from snowflake_queries import (BUCKETS, PANELS, auto_bucket, build_aggregate_query, default_query, default_range,
+                               measure_label)
+from snowflake_sync import SYNC_TABLES, BackgroundSync, LocalStore
+
 # --- Streamlit App Title ---
 st.set_page_config(page_title="Snowflake Architect Dashboard", layout="wide")
 st.title("❄️ Snowflake Data Engineering & Strategy Dashboard")
 
 # --- Snowflake Connection Function ---
-@st.cache_resource
 def connect_snowflake():
     return snowflake.connector.connect(
         user="your_username",
@@ -16,58 +26,222 @@ def connect_snowflake():
         account="your_account"
     )
 
-conn = connect_snowflake()
+# A few connections shared by every session, so panel loaders can query in parallel
+@st.cache_resource
+def get_connection_pool():
+    return ConnectionPool(connect_snowflake, max_size=4)
+
+@st.cache_resource
+def get_prefetcher():
+    return Prefetcher(max_workers=4)
+
+# --- Query Result Cache ---
+# ACCOUNT_USAGE views change slowly, so each panel accepts results up to this old
+PANEL_TTL_SECONDS = {
+    "User Activity": 15 * 60,
+    "Warehouse Utilization": 30 * 60,
+    "Data Governance": 6 * 3600,
+    "RBAC Monitoring": 6 * 3600,
+}
+
+# Shared by every session; SNOWFLAKE_CACHE_DIR also keeps results as Parquet across restarts
+@st.cache_resource
+def get_query_cache():
+    return QueryCache()
+
+query_cache = get_query_cache()
+
+def run_query(query, params=None, on_batch=None):
+    # Connecting is deferred to the first cache miss, so a warm dashboard never touches Snowflake.
+    # Also runs on loader threads, so it must not call st itself.
+    with get_connection_pool().connection() as conn:
+        # Results arrive as Arrow batches and become one columnar DataFrame, not a list of row tuples
+        return fetch_dataframe(conn, query, params, on_batch=on_batch)
+
+def run_query_with_status(query, params=None):
+    status = st.empty()
+    df = run_query(query, params, on_batch=lambda rows: status.caption(f"Fetching from Snowflake... {rows:,} rows"))
+    status.empty()
+    return df
+
+def load_panel(query, params, ttl_seconds):
+    """Background loader: fills the shared cache, which single-flights it with any foreground read"""
+    return query_cache.get_or_fetch(query, run_query, params, ttl_seconds)
+
+# --- Local Store ---
+# A background job appends new ACCOUNT_USAGE rows to a local SQLite copy; panels can read that instead
+@st.cache_resource
+def get_local_store():
+    return LocalStore()
+
+@st.cache_resource
+def get_background_sync():
+    return BackgroundSync(get_connection_pool().connection, get_local_store(),
+                          interval=float(os.environ.get("SNOWFLAKE_SYNC_INTERVAL", 900)))
 
 # --- Fetch Data Function ---
-def fetch_data(query):
-    cur = conn.cursor()
-    cur.execute(query)
-    return pd.DataFrame(cur.fetchall(), columns=[desc[0] for desc in cur.description])
+def fetch_data(query, params=None, ttl_seconds=3600):
+    if data_source == "Local store":
+        df = get_local_store().read_sql(query, params or ())
+        st.caption(f"Loaded from the local store · {sync_status}")
+        return df
+    if refresh_requested:
+        query_cache.invalidate(query, params)
+    df, fetched_at, from_cache = query_cache.get_or_fetch(query, run_query_with_status, params, ttl_seconds)
+    show_freshness(fetched_at, from_cache, ttl_seconds)
+    return df
+
+def show_freshness(fetched_at, from_cache, ttl_seconds):
+    age = time.time() - fetched_at
+    source = "cache" if from_cache else "Snowflake"
+    st.caption(f"Loaded from {source} · fetched {age / 60:.0f} min ago · refreshes after {ttl_seconds // 60} min")
 
 # --- Sidebar Navigation ---
 st.sidebar.header("Navigation")
-menu = st.sidebar.radio("Go to", ["User Activity", "Warehouse Utilization", "Data Governance", "RBAC Monitoring"])
+menu = st.sidebar.radio("Go to", ["Overview", "User Activity", "Warehouse Utilization", "Data Governance",
+                                  "RBAC Monitoring"])
+history_rows = st.sidebar.selectbox("History rows", [50, 1000, 10000, 100000, 1000000])
+data_source = st.sidebar.radio("Data source", ["Local store", "Snowflake"],
+                               help="Local store: synced copy of ACCOUNT_USAGE, no warehouse credits per view")
+if data_source == "Local store":
+    sync = get_background_sync()
+    if st.sidebar.button("⏩ Sync now"):
+        sync.sync_now()
+    synced_at = [get_local_store().state(table)[1] for table in SYNC_TABLES]
+    if None in synced_at:
+        sync_status = "first sync still running" if sync.last_error is None else f"sync failed: {sync.last_error}"
+    else:
+        sync_status = f"synced {(time.time() - min(synced_at)) / 60:.0f} min ago"
+        if sync.last_error is not None:
+            sync_status += f" · last sync failed: {sync.last_error}"
+refresh_requested = data_source == "Snowflake" and st.sidebar.button("🔄 Refresh data")
+point_budget = st.sidebar.number_input("Chart point budget", min_value=100, max_value=100000,
+                                       value=DEFAULT_POINT_BUDGET, step=500,
+                                       help="Most points sent to the browser per chart; larger results are downsampled")
+
+# --- Aggregated Charts ---
+# Charts are built from GROUP BY results, so their size does not depend on how much history is covered
+PANEL_CHARTS = {
+    "User Activity": ("Query Execution Time by User", "bar"),
+    "Warehouse Utilization": ("Credits Used by Warehouse", "pie"),
+    "Data Governance": ("Data Masking & Governance Policies", "bar"),
+    "RBAC Monitoring": ("RBAC Privileges by Role", "bar"),
+}
+
+def plot_aggregate(panel, df, dimension, measure, bucket=None, key=None):
+    spec = PANELS[panel]
+    title, kind = PANEL_CHARTS[panel]
+    labels = {dimension: spec["dimensions"][dimension], measure: measure_label(panel, measure)}
+    # Reduce to the point budget before the figure is built, so payload and render time stay flat
+    if bucket:
+        df = downsample_series(df, "bucket", measure, by=dimension, budget=point_budget)
+        fig = px.line(df, x="bucket", y=measure, color=dimension, title=title, labels=labels, markers=True)
+    else:
+        # Sums and counts fold the tail into "Other"; averages just drop it
+        additive = spec["measures"][measure][0] in ("SUM", "COUNT")
+        df = top_categories(df, dimension, measure, budget=point_budget, other_label="Other" if additive else None)
+        if kind == "pie":
+            fig = px.pie(df, values=measure, names=dimension, title=title, labels=labels)
+        else:
+            fig = px.bar(df, x=dimension, y=measure, title=title, labels=labels)
+    st.plotly_chart(fig, key=key)
+
+def aggregate_chart(panel):
+    spec = PANELS[panel]
+    cols = st.columns(4 if spec["time_column"] else 2)
+    dimension = cols[0].selectbox("Group by", list(spec["dimensions"]), format_func=spec["dimensions"].get,
+                                  key=f"{panel}_dimension")
+    measure = cols[1].selectbox("Measure", list(spec["measures"]), format_func=lambda m: measure_label(panel, m),
+                                key=f"{panel}_measure")
+    bucket = start = end = None
+    if spec["time_column"]:
+        dates = cols[2].date_input("Date range", default_range(), key=f"{panel}_range")
+        if len(dates) != 2:
+            st.info("Pick an end date for the range.")
+            return
+        start, end = dates
+        bucket = cols[3].selectbox("Time bucket", ["none", "auto", *BUCKETS], key=f"{panel}_bucket")
+        bucket = None if bucket == "none" else auto_bucket(start, end) if bucket == "auto" else bucket
+
+    dialect = "sqlite" if data_source == "Local store" else "snowflake"
+    sql, params = build_aggregate_query(panel, dimension, measure, bucket, start, end, dialect=dialect)
+    df = fetch_data(sql, params, ttl_seconds=PANEL_TTL_SECONDS[panel])
+    plot_aggregate(panel, df, dimension, measure, bucket)
+
+# --- Overview ---
+# The four default charts are loaded concurrently, each on its own pooled connection
+if menu == "Overview":
+    st.subheader("🧭 Overview")
+    if data_source == "Local store":
+        st.caption(f"Loaded from the local store · {sync_status}")
+    elif refresh_requested:
+        for panel in PANEL_CHARTS:
+            query_cache.invalidate(*default_query(panel))
+    with st.spinner("Loading panels..."):
+        if data_source == "Snowflake":
+            loads = {panel: get_prefetcher().submit(query_key(*default_query(panel)), load_panel,
+                                                    *default_query(panel), PANEL_TTL_SECONDS[panel])
+                     for panel in PANEL_CHARTS}
+        cols = st.columns(2)
+        for i, panel in enumerate(PANEL_CHARTS):
+            spec = PANELS[panel]
+            dimension, measure = next(iter(spec["dimensions"])), next(iter(spec["measures"]))
+            with cols[i % 2]:
+                if data_source == "Local store":
+                    df = get_local_store().read_sql(*default_query(panel, dialect="sqlite"))
+                else:
+                    df, fetched_at, from_cache = loads[panel].result()
+                    show_freshness(fetched_at, from_cache, PANEL_TTL_SECONDS[panel])
+                plot_aggregate(panel, df, dimension, measure, key=f"overview_{panel}")
 
 # --- User Activity & Credit Consumption ---
-if menu == "User Activity":
+elif menu == "User Activity":
     st.subheader("📊 User Activity & Credit Consumption")
-    query = "SELECT user_name, query_text, execution_time, warehouse_size FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY ORDER BY start_time DESC LIMIT 50"
-    df = fetch_data(query)
-    st.dataframe(df)
+    query = f"SELECT user_name, query_text, execution_time, warehouse_size FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY ORDER BY start_time DESC LIMIT {history_rows}"
+    if st.checkbox("Show recent queries"):
+        st.dataframe(fetch_data(query, ttl_seconds=PANEL_TTL_SECONDS[menu]))
 
-    fig = px.bar(df, x="user_name", y="execution_time", title="Query Execution Time by User", color="warehouse_size")
-    st.plotly_chart(fig)
+    aggregate_chart(menu)
 
 # --- Warehouse Utilization & Workload Analysis ---
 elif menu == "Warehouse Utilization":
     st.subheader("🏢 Warehouse Utilization & Workload Analysis")
-    query = "SELECT warehouse_name, avg_load_percent, total_queries, credits_used FROM SNOWFLAKE.ACCOUNT_USAGE.WAREHOUSE_LOAD_HISTORY ORDER BY start_time DESC LIMIT 50"
-    df = fetch_data(query)
-    st.dataframe(df)
+    query = f"SELECT warehouse_name, avg_load_percent, total_queries, credits_used FROM SNOWFLAKE.ACCOUNT_USAGE.WAREHOUSE_LOAD_HISTORY ORDER BY start_time DESC LIMIT {history_rows}"
+    if st.checkbox("Show recent load history"):
+        st.dataframe(fetch_data(query, ttl_seconds=PANEL_TTL_SECONDS[menu]))
 
-    fig = px.pie(df, values="credits_used", names="warehouse_name", title="Credits Used by Warehouse")
-    st.plotly_chart(fig)
+    aggregate_chart(menu)
 
 # --- Data Governance & Security ---
 elif menu == "Data Governance":
     st.subheader("🔒 Data Governance & Security")
     query = "SELECT table_name, policy_name, policy_type FROM SNOWFLAKE.ACCOUNT_USAGE.POLICY_REFERENCES"
-    df = fetch_data(query)
-    st.dataframe(df)
+    if st.checkbox("Show policy references"):
+        st.dataframe(fetch_data(query, ttl_seconds=PANEL_TTL_SECONDS[menu]))
 
-    fig = px.bar(df, x="table_name", y="policy_type", title="Data Masking & Governance Policies", color="policy_name")
-    st.plotly_chart(fig)
+    aggregate_chart(menu)
 
 # --- Role-Based Access Control (RBAC) Monitoring ---
 elif menu == "RBAC Monitoring":
     st.subheader("🔑 Role-Based Access Control (RBAC) Monitoring")
     query = "SELECT role_name, granted_to, privilege FROM SNOWFLAKE.ACCOUNT_USAGE.GRANTS_TO_ROLES"
-    df = fetch_data(query)
-    st.dataframe(df)
+    if st.checkbox("Show grants"):
+        st.dataframe(fetch_data(query, ttl_seconds=PANEL_TTL_SECONDS[menu]))
+
+    aggregate_chart(menu)
 
-    fig = px.bar(df, x="role_name", y="privilege", title="RBAC Privileges by Role", color="granted_to")
-    st.plotly_chart(fig)
+# --- Background Prefetch ---
+# Once this page is drawn, warm the cache with the other panels' default charts so switching menus is instant.
+# The Prefetcher drops duplicate submits and the cache single-flights against a foreground read of the same query.
+if data_source == "Snowflake":
+    for panel in PANEL_CHARTS:
+        if panel != menu:
+            get_prefetcher().submit(query_key(*default_query(panel)), load_panel, *default_query(panel),
+                                    PANEL_TTL_SECONDS[panel])
 
 # --- Footer ---
+stats = query_cache.stats()
+st.sidebar.caption(f"Result cache: {stats['hits'] + stats['disk_hits']} hits / {stats['misses']} warehouse queries "
+                   f"({stats['hit_rate']:.0%} hit rate)")
 st.sidebar.markdown("---")
 st.sidebar.markdown("🚀 **Developed by ChatGPT** | Snowflake Data Engineering")
@@ -0,0 +1,172 @@
+# snowflake_cache.py
+import hashlib
+import importlib.util
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_DIR = os.environ.get("SNOWFLAKE_CACHE_DIR")
+
+
+def query_key(query, params=None):
+    """Content address of one result: sha256 over the query text and its parameters"""
+    digest = hashlib.sha256()
+    for part in (query, repr(params)):
+        data = part.encode("utf-8")
+        # Length-prefix each part so the query text and parameters can never run together
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class QueryCache:
+    """Process-wide cache of query results with per-call TTLs and an optional Parquet tier
+
+    Results are held in memory for every session, at most max_entries of them in LRU
+    order; a result is dropped once the TTL it was fetched with has run out. With a
+    directory (and pyarrow or fastparquet installed) each result is also written as Parquet, so a restarted
+    dashboard starts warm. Concurrent misses on the same query wait for one fetch
+    instead of each running it against the warehouse.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_entries=64):
+        has_parquet = importlib.util.find_spec("pyarrow") or importlib.util.find_spec("fastparquet")
+        self.directory = directory if directory and has_parquet else None
+        self.max_entries = max_entries
+        # key -> (DataFrame, fetched_at, expires_at); expires_at is None for results without a TTL
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._fetch_locks = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.parquet")
+
+    def _read_disk(self, key):
+        import pandas as pd
+
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            # The file's mtime is when the result was fetched
+            return pd.read_parquet(path), os.path.getmtime(path)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key, df, fetched_at):
+        if not self.directory:
+            return
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            df.to_parquet(temp_path, index=False)
+            os.utime(temp_path, (fetched_at, fetched_at))
+            os.replace(temp_path, path)
+        except Exception:
+            # The disk tier is best-effort: columns Parquet cannot represent (mixed object types,
+            # unsupported Arrow types) or a full disk leave the result memory-only
+            try:
+                os.unlink(temp_path)
+            except FileNotFoundError:
+                pass
+
+    def _fresh(self, key, ttl_seconds, now):
+        entry = self._entries.get(key)
+        if entry is not None and (ttl_seconds is None or now - entry[1] <= ttl_seconds):
+            self._entries.move_to_end(key)
+            return entry
+        return None
+
+    def _remember(self, key, df, fetched_at, ttl_seconds):
+        # Caller holds self._lock
+        self._entries[key] = (df, fetched_at, None if ttl_seconds is None else fetched_at + ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _evict_expired(self, now):
+        # Caller holds self._lock
+        for key in [key for key, (_, _, expires_at) in self._entries.items()
+                    if expires_at is not None and expires_at < now]:
+            del self._entries[key]
+
+    def get_or_fetch(self, query, fetch, params=None, ttl_seconds=3600):
+        """(DataFrame, fetched_at, from_cache) for query, calling fetch(query, params) when stale"""
+        key = query_key(query, params)
+        now = time.time()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._fresh(key, ttl_seconds, now)
+            if entry is not None:
+                self.hits += 1
+                return entry[0], entry[1], True
+            # [lock, waiters]: the entry is dropped once nobody is fetching or waiting on key
+            fetch_lock = self._fetch_locks.setdefault(key, [threading.Lock(), 0])
+            fetch_lock[1] += 1
+        try:
+            with fetch_lock[0]:
+                # Another session may have refreshed it while this one waited
+                with self._lock:
+                    entry = self._fresh(key, ttl_seconds, time.time())
+                    if entry is not None:
+                        self.hits += 1
+                        return entry[0], entry[1], True
+                entry = self._read_disk(key) if key not in self._entries else None
+                if entry is not None and (ttl_seconds is None or time.time() - entry[1] <= ttl_seconds):
+                    with self._lock:
+                        self._remember(key, entry[0], entry[1], ttl_seconds)
+                        self.disk_hits += 1
+                    return entry[0], entry[1], True
+                df = fetch(query, params)
+                fetched_at = time.time()
+                with self._lock:
+                    self._evict_expired(fetched_at)
+                    self._remember(key, df, fetched_at, ttl_seconds)
+                    self.misses += 1
+                self._write_disk(key, df, fetched_at)
+                return df, fetched_at, False
+        finally:
+            with self._lock:
+                fetch_lock[1] -= 1
+                if fetch_lock[1] == 0:
+                    del self._fetch_locks[key]
+
+    def invalidate(self, query, params=None):
+        """Drop one result so the next read goes to the warehouse"""
+        key = query_key(query, params)
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.directory:
+            try:
+                os.unlink(self._path(key))
+            except FileNotFoundError:
+                # Never written, or another session invalidated it first
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.directory:
+            for name in os.listdir(self.directory):
+                if name.endswith(".parquet"):
+                    try:
+                        os.unlink(os.path.join(self.directory, name))
+                    except FileNotFoundError:
+                        pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
@@ -0,0 +1,114 @@
+# snowflake_fetch.py
+"""Columnar fetch helpers for Snowflake result sets.
+
+The connector can hand results over as Arrow record batches, which convert to pandas
+column by column instead of through a list of Python row tuples. Both helpers fall
+back to fetchmany when the connector was installed without its pandas extra, or
+when the result is not in Arrow format (e.g. SHOW commands).
+
+    for batch in iter_pandas_batches(conn, "SELECT * FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY"):
+        ...
+"""
+from itertools import chain
+
+import pandas as pd
+
+FALLBACK_BATCH_ROWS = 50000
+
+
+def _arrow_unavailable_errors():
+    """Errors meaning "no Arrow here": missing pandas extra, non-Arrow result, or a cursor without it"""
+    errors = (ImportError, NotImplementedError)
+    try:
+        from snowflake.connector.errors import NotSupportedError, ProgrammingError
+    except ImportError:
+        return errors
+    return errors + (NotSupportedError, ProgrammingError)
+
+
+def _iter_fetchmany(cur, batch_rows):
+    columns = [desc[0] for desc in cur.description]
+    rows = cur.fetchmany(batch_rows)
+    # An empty result still yields one frame, so callers always see the schema
+    yield pd.DataFrame(rows, columns=columns)
+    while True:
+        rows = cur.fetchmany(batch_rows)
+        if not rows:
+            return
+        yield pd.DataFrame(rows, columns=columns)
+
+
+def iter_arrow_batches(conn, query, params=None):
+    """Yield pyarrow Tables for query, one per result chunk as the connector downloads it"""
+    cur = conn.cursor()
+    try:
+        cur.execute(query, params)
+        yield from cur.fetch_arrow_batches()
+    finally:
+        cur.close()
+
+
+def iter_pandas_batches(conn, query, params=None, batch_rows=FALLBACK_BATCH_ROWS):
+    """Yield DataFrames for query, one per result chunk, with columnar dtypes where possible"""
+    cur = conn.cursor()
+    try:
+        cur.execute(query, params)
+        try:
+            batches = cur.fetch_arrow_batches()
+            first = next(batches, None)
+        except _arrow_unavailable_errors():
+            yield from _iter_fetchmany(cur, batch_rows)
+            return
+        if first is None:
+            # Empty result: keep the column names so panels still see the schema
+            yield pd.DataFrame(columns=[desc[0] for desc in cur.description])
+            return
+        yield first.to_pandas()
+        for table in batches:
+            yield table.to_pandas()
+    finally:
+        cur.close()
+
+
+def fetch_dataframe(conn, query, params=None, on_batch=None):
+    """Whole result of query as one DataFrame, built from Arrow batches
+
+    The batches are concatenated as Arrow tables and converted once, freeing each
+    Arrow buffer as its column is converted, so the peak is about one copy of the data
+    rather than rows of Python objects plus a frame. on_batch, if given, is called
+    with the running row count after every batch.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute(query, params)
+        try:
+            batches = cur.fetch_arrow_batches()
+            first = next(batches, None)
+        except _arrow_unavailable_errors():
+            # Nothing has been read from the cursor yet, so fetchmany still sees every row
+            frames = []
+            rows = 0
+            for frame in _iter_fetchmany(cur, FALLBACK_BATCH_ROWS):
+                frames.append(frame)
+                rows += len(frame)
+                if on_batch:
+                    on_batch(rows)
+            return pd.concat(frames, ignore_index=True)
+        # Past the first batch an error propagates: falling back now would silently drop rows
+        tables = []
+        rows = 0
+        if first is not None:
+            for table in chain([first], batches):
+                tables.append(table)
+                rows += table.num_rows
+                if on_batch:
+                    on_batch(rows)
+        if not tables:
+            return pd.DataFrame(columns=[desc[0] for desc in cur.description])
+        import pyarrow as pa
+
+        combined = pa.concat_tables(tables)
+        del tables
+        return combined.to_pandas(self_destruct=True, split_blocks=True)
+    finally:
+        cur.close()
@@ -0,0 +1,67 @@
+# snowflake_pool.py
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+class ConnectionPool:
+    """Small pool of Snowflake connections shared by every session and background loader
+
+    At most max_size connections are open at once; a caller that finds them all
+    borrowed waits for one to come back. Connections are opened lazily, on first use.
+    """
+
+    def __init__(self, connect, max_size=4):
+        self._connect = connect
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    @contextmanager
+    def connection(self):
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            finally:
+                # A connection the server closed (e.g. session expiry) is dropped, not reused
+                if not getattr(conn, "is_closed", lambda: False)():
+                    self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class Prefetcher:
+    """Thread pool for panel loaders that ignores a load already in flight for the same key"""
+
+    def __init__(self, max_workers=4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="panel-loader")
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args, **kwargs):
+        """Future for fn(*args, **kwargs), shared with any identical load still running"""
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None:
+                return future
+            future = self._executor.submit(fn, *args, **kwargs)
+            self._pending[key] = future
+        future.add_done_callback(lambda _: self._forget(key, future))
+        return future
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
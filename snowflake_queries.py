@@ -0,0 +1,150 @@
+# snowflake_queries.py
+"""GROUP BY query builder for the Snowflake dashboard panels.
+
+Each panel chart is an aggregate of one measure by one dimension, optionally per
+time bucket, over a date range. Only those aggregates cross the wire, and the number
+of rows is bounded by top_n dimension values times the number of buckets, so payload
+and plotting cost do not grow with the amount of history covered.
+
+Every identifier comes from PANELS, never from user input; values are bound as
+parameters. The same query can be generated for Snowflake or for the local SQLite
+copy made by snowflake_sync.
+
+    sql, params = build_aggregate_query("User Activity", "user_name", "total_execution_time",
+                                        bucket="day", start=date(2024, 5, 1), end=date(2024, 5, 31))
+"""
+from datetime import date, datetime, timedelta
+
+SOURCE_SCHEMA = "SNOWFLAKE.ACCOUNT_USAGE"
+
+PANELS = {
+    "User Activity": {
+        "view": "QUERY_HISTORY",
+        "time_column": "start_time",
+        "dimensions": {"user_name": "User", "warehouse_name": "Warehouse", "warehouse_size": "Warehouse size"},
+        "measures": {
+            "total_execution_time": ("SUM", "execution_time", "Total execution time"),
+            "avg_execution_time": ("AVG", "execution_time", "Average execution time"),
+            "query_count": ("COUNT", "*", "Queries"),
+        },
+    },
+    "Warehouse Utilization": {
+        "view": "WAREHOUSE_LOAD_HISTORY",
+        "time_column": "start_time",
+        "dimensions": {"warehouse_name": "Warehouse"},
+        "measures": {
+            "credits_used": ("SUM", "credits_used", "Credits used"),
+            "avg_load_percent": ("AVG", "avg_load_percent", "Average load %"),
+            "total_queries": ("SUM", "total_queries", "Queries"),
+        },
+    },
+    "Data Governance": {
+        "view": "POLICY_REFERENCES",
+        "time_column": None,
+        "dimensions": {"table_name": "Table", "policy_name": "Policy", "policy_type": "Policy type"},
+        "measures": {"policy_count": ("COUNT", "*", "Policy references")},
+    },
+    "RBAC Monitoring": {
+        "view": "GRANTS_TO_ROLES",
+        "time_column": None,
+        "dimensions": {"role_name": "Role", "granted_to": "Granted to", "privilege": "Privilege"},
+        "measures": {"grant_count": ("COUNT", "*", "Grants")},
+    },
+}
+
+BUCKETS = ("hour", "day", "week", "month")
+# Rough bucket widths, used to pick one that keeps a chart under max_buckets points
+BUCKET_SECONDS = {"hour": 3600, "day": 86400, "week": 7 * 86400, "month": 30 * 86400}
+
+SQLITE_BUCKETS = {
+    "hour": "strftime('%Y-%m-%d %H:00:00', {column})",
+    "day": "date({column})",
+    "week": "date({column}, 'weekday 0', '-6 days')",
+    "month": "strftime('%Y-%m-01', {column})",
+}
+
+
+def auto_bucket(start, end, max_buckets=200):
+    """Finest bucket that keeps [start, end) under max_buckets points"""
+    span = (end - start).total_seconds() if start and end else None
+    for bucket in BUCKETS:
+        if span is not None and span / BUCKET_SECONDS[bucket] <= max_buckets:
+            return bucket
+    return "month"
+
+
+def _bucket_expression(bucket, column, dialect):
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of {BUCKETS}")
+    if dialect == "sqlite":
+        return SQLITE_BUCKETS[bucket].format(column=column)
+    return f"DATE_TRUNC('{bucket}', {column})"
+
+
+def _bound(value):
+    """Date range bound as a parameter both engines compare correctly against their timestamps"""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return value.isoformat()
+
+
+def build_aggregate_query(panel, dimension, measure, bucket=None, start=None, end=None, top_n=20,
+                          dialect="snowflake"):
+    """(sql, params) aggregating measure by dimension (and time bucket) for one panel
+
+    start is inclusive and end exclusive; a date end means "up to the end of that day".
+    Without a bucket the top_n dimension values by measure come back; with one, the
+    top_n dimension values are chosen over the whole range and returned per bucket.
+    """
+    spec = PANELS[panel]
+    if dimension not in spec["dimensions"]:
+        raise ValueError(f"dimension must be one of {sorted(spec['dimensions'])}")
+    if measure not in spec["measures"]:
+        raise ValueError(f"measure must be one of {sorted(spec['measures'])}")
+    function, column, _ = spec["measures"][measure]
+    aggregate = f"{function}({column})"
+    placeholder = "?" if dialect == "sqlite" else "%s"
+    source = spec["view"] if dialect == "sqlite" else f"{SOURCE_SCHEMA}.{spec['view']}"
+    time_column = spec["time_column"]
+
+    clauses, params = [], []
+    if time_column and start is not None:
+        clauses.append(f"{time_column} >= {placeholder}")
+        params.append(_bound(start))
+    if time_column and end is not None:
+        if not isinstance(end, datetime):
+            end = end + timedelta(days=1)
+        clauses.append(f"{time_column} < {placeholder}")
+        params.append(_bound(end))
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+
+    if not bucket or not time_column:
+        sql = (f'SELECT {dimension} AS "{dimension}", {aggregate} AS "{measure}" FROM {source}{where} '
+               f'GROUP BY {dimension} ORDER BY "{measure}" DESC LIMIT {int(top_n)}')
+        return sql, params
+
+    bucket_expression = _bucket_expression(bucket, time_column, dialect)
+    top_dimensions = (f"SELECT {dimension} FROM {source}{where} GROUP BY {dimension} "
+                      f"ORDER BY {aggregate} DESC LIMIT {int(top_n)}")
+    restricted = (where + " AND " if where else " WHERE ") + f"{dimension} IN ({top_dimensions})"
+    sql = (f'SELECT {bucket_expression} AS "bucket", {dimension} AS "{dimension}", {aggregate} AS "{measure}" '
+           f'FROM {source}{restricted} GROUP BY 1, 2 ORDER BY 1, 2')
+    # The range parameters appear twice: once for the outer query, once for the top-n subquery
+    return sql, params + params
+
+
+def default_query(panel, dialect="snowflake"):
+    """(sql, params) of the chart a panel shows before any control is touched"""
+    spec = PANELS[panel]
+    start, end = default_range() if spec["time_column"] else (None, None)
+    return build_aggregate_query(panel, next(iter(spec["dimensions"])), next(iter(spec["measures"])),
+                                 start=start, end=end, dialect=dialect)
+
+
+def measure_label(panel, measure):
+    return PANELS[panel]["measures"][measure][2]
+
+
+def default_range(days=30, today=None):
+    today = today or date.today()
+    return today - timedelta(days=days - 1), today
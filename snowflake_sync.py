@@ -0,0 +1,318 @@
+# snowflake_sync.py
+"""Incremental sync of SNOWFLAKE.ACCOUNT_USAGE views into a local SQLite store.
+
+History views are pulled by watermark: only rows whose start_time is newer than the
+last synced one (minus a lookback, because ACCOUNT_USAGE rows can land late) are
+fetched and upserted on their key. Small reference views are replaced as a snapshot.
+The dashboard then reads from the local tables, which keep the view names, so months
+of history can be explored without spending warehouse credits on every view.
+
+    python snowflake_sync.py --db account_usage.db --interval 900
+    python snowflake_sync.py --db demo.db --replay fixtures/   # offline, from CSV files
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import closing, contextmanager
+from datetime import timezone
+
+from snowflake_fetch import iter_pandas_batches
+
+DEFAULT_LOCAL_DB = os.environ.get("ACCOUNT_USAGE_DB", "account_usage.db")
+SOURCE_SCHEMA = "SNOWFLAKE.ACCOUNT_USAGE"
+# ACCOUNT_USAGE can be up to ~45 minutes behind; re-read that window on every sync
+DEFAULT_LOOKBACK_SECONDS = 2 * 3600
+
+# view -> columns pulled, key columns for upserts, watermark column (None means snapshot)
+SYNC_TABLES = {
+    "QUERY_HISTORY": {
+        "columns": ["query_id", "user_name", "query_text", "warehouse_name", "warehouse_size",
+                    "execution_time", "start_time"],
+        "key": ["query_id"],
+        "watermark": "start_time",
+    },
+    "WAREHOUSE_LOAD_HISTORY": {
+        "columns": ["warehouse_name", "start_time", "avg_load_percent", "total_queries", "credits_used"],
+        "key": ["warehouse_name", "start_time"],
+        "watermark": "start_time",
+    },
+    "POLICY_REFERENCES": {
+        "columns": ["table_name", "policy_name", "policy_type"],
+        "key": None,
+        "watermark": None,
+    },
+    "GRANTS_TO_ROLES": {
+        "columns": ["role_name", "granted_to", "privilege"],
+        "key": None,
+        "watermark": None,
+    },
+}
+
+
+def _sql_value(value):
+    """pandas/Arrow scalar -> something sqlite3 can bind; timestamps become ISO-8601 text
+
+    Zoned timestamps are converted to UTC first, so stored text from syncs on either
+    side of a DST change or a session TIMEZONE change uses one offset.
+    """
+    if value is None:
+        return None
+    if hasattr(value, "isoformat"):
+        if getattr(value, "tzinfo", None) is not None:
+            value = value.astimezone(timezone.utc)
+        return value.isoformat(sep=" ")
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def _instant(value):
+    """Sort key for a watermark: the UTC instant of ISO-8601 text, whatever its offset"""
+    import pandas as pd
+
+    timestamp = pd.Timestamp(value)
+    return timestamp.tz_convert("UTC").tz_localize(None) if timestamp.tzinfo is not None else timestamp
+
+
+class LocalStore:
+    """SQLite copy of the synced ACCOUNT_USAGE views plus their sync watermarks
+
+    Syncs write through one connection inside a transaction that lasts as long as
+    the remote fetch. Reads open their own connection, so under WAL they see the last
+    committed copy instead of waiting for a sync (minutes on a first backfill).
+    """
+
+    def __init__(self, path=DEFAULT_LOCAL_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute('''
+        CREATE TABLE IF NOT EXISTS sync_state (
+            table_name TEXT PRIMARY KEY,
+            watermark TEXT,
+            synced_at REAL,
+            row_count INTEGER
+        )
+        ''')
+        for table, spec in SYNC_TABLES.items():
+            key = f", PRIMARY KEY ({', '.join(spec['key'])})" if spec["key"] else ""
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(spec['columns'])}{key})")
+            if spec["watermark"]:
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table.lower()}_{spec['watermark']} "
+                                   f"ON {table} ({spec['watermark']})")
+        self._conn.commit()
+
+    @contextmanager
+    def transaction(self):
+        """The writer connection inside one transaction; only other writers wait for it"""
+        with self._lock:
+            with self._conn:
+                yield self._conn
+
+    @contextmanager
+    def reader(self):
+        """A short-lived read connection, independent of any sync in progress"""
+        conn = sqlite3.connect(self.path)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def state(self, table):
+        """(watermark, synced_at, row_count) for table, or (None, None, 0) if never synced"""
+        with self.reader() as conn:
+            row = conn.execute("SELECT watermark, synced_at, row_count FROM sync_state WHERE table_name = ?",
+                               (table,)).fetchone()
+        return row or (None, None, 0)
+
+    def read_sql(self, query, params=()):
+        """Run a dashboard query locally; SNOWFLAKE.ACCOUNT_USAGE.<view> maps to the local table"""
+        import pandas as pd
+
+        with self.reader() as conn:
+            return pd.read_sql_query(query.replace(SOURCE_SCHEMA + ".", ""), conn, params=params)
+
+    def close(self):
+        self._conn.close()
+
+
+def sync_table(conn, store, table, lookback_seconds=DEFAULT_LOOKBACK_SECONDS):
+    """Pull new rows of one view into store; returns the number of rows fetched"""
+    spec = SYNC_TABLES[table]
+    columns = spec["columns"]
+    watermark_column = spec["watermark"]
+    placeholders = ", ".join("?" * len(columns))
+    verb = "INSERT OR REPLACE" if spec["key"] else "INSERT"
+    insert = f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+    fetched = 0
+    # One transaction per view: a failed sync leaves the previous copy and watermark intact
+    with store.transaction() as local:
+        # Read under the writer lock, so two syncs of one view can never start from the same watermark
+        row = local.execute("SELECT watermark FROM sync_state WHERE table_name = ?", (table,)).fetchone()
+        watermark = new_watermark = row[0] if row else None
+        query = f"SELECT {', '.join(columns)} FROM {SOURCE_SCHEMA}.{table}"
+        params = None
+        if watermark_column and watermark:
+            query += f" WHERE {watermark_column} > DATEADD(second, %s, %s::TIMESTAMP_LTZ)"
+            params = (-lookback_seconds, watermark)
+        if watermark_column:
+            query += f" ORDER BY {watermark_column}"
+        if not watermark_column:
+            local.execute(f"DELETE FROM {table}")
+        for batch in iter_pandas_batches(conn, query, params):
+            batch.columns = [column.lower() for column in batch.columns]
+            rows = [tuple(_sql_value(value) for value in row)
+                    for row in batch[columns].itertuples(index=False, name=None)]
+            local.executemany(insert, rows)
+            fetched += len(rows)
+            if watermark_column:
+                # Compare instants, not text: offsets in older stored watermarks can differ
+                position = columns.index(watermark_column)
+                values = [row[position] for row in rows if row[position] is not None]
+                if new_watermark is not None:
+                    values.append(new_watermark)
+                if values:
+                    new_watermark = max(values, key=_instant)
+        row_count = local.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        local.execute("INSERT OR REPLACE INTO sync_state (table_name, watermark, synced_at, row_count) "
+                      "VALUES (?, ?, ?, ?)", (table, new_watermark, time.time(), row_count))
+    return fetched
+
+
+def sync_all(conn, store, tables=None, lookback_seconds=DEFAULT_LOOKBACK_SECONDS):
+    """Sync every configured view; returns {view: rows fetched}"""
+    return {table: sync_table(conn, store, table, lookback_seconds) for table in (tables or SYNC_TABLES)}
+
+
+class BackgroundSync:
+    """Daemon thread that calls sync_all every interval seconds
+
+    connection is a context manager factory, e.g. ConnectionPool.connection, so the
+    sync borrows a connection per round instead of holding one.
+    """
+
+    def __init__(self, connection, store, interval=900, lookback_seconds=DEFAULT_LOOKBACK_SECONDS):
+        self.connection = connection
+        self.store = store
+        self.interval = interval
+        self.lookback_seconds = lookback_seconds
+        self.last_result = None
+        self.last_error = None
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="account-usage-sync", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                with self.connection() as conn:
+                    self.last_result = sync_all(conn, self.store, lookback_seconds=self.lookback_seconds)
+                self.last_error = None
+            except Exception as e:
+                # Keep the thread alive; the dashboard shows the error and the next round retries
+                self.last_error = e
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def sync_now(self):
+        self._wake.set()
+
+
+class ReplayConnection:
+    """Offline stand-in for a Snowflake connection that answers sync queries from CSV files
+
+    fixtures holds one <VIEW>.csv per view. Watermark filters are applied the way the
+    warehouse would, so repeated syncs against growing fixture files behave like
+    incremental syncs against ACCOUNT_USAGE.
+    """
+
+    def __init__(self, fixtures):
+        self.fixtures = fixtures
+
+    def cursor(self):
+        return ReplayCursor(self.fixtures)
+
+    def close(self):
+        pass
+
+
+class ReplayCursor:
+    def __init__(self, fixtures):
+        self.fixtures = fixtures
+        self.description = None
+        self._rows = []
+
+    def execute(self, query, params=None):
+        import re
+
+        import pandas as pd
+
+        table = re.search(rf"FROM {re.escape(SOURCE_SCHEMA)}\.(\w+)", query).group(1)
+        spec = SYNC_TABLES[table]
+        df = pd.read_csv(os.path.join(self.fixtures, f"{table}.csv"))
+        df.columns = [column.lower() for column in df.columns]
+        if params and spec["watermark"]:
+            lookback, watermark = params
+            cutoff = _instant(watermark) + pd.Timedelta(seconds=lookback)
+            df = df[df[spec["watermark"]].map(_instant) > cutoff]
+        if spec["watermark"]:
+            df = df.sort_values(spec["watermark"], key=lambda column: column.map(_instant))
+        df = df[spec["columns"]]
+        self.description = [(column.upper(),) for column in df.columns]
+        self._rows = [tuple(None if value != value else value for value in row)
+                      for row in df.itertuples(index=False, name=None)]
+
+    def fetch_arrow_batches(self):
+        # The replay has no Arrow result format, like a connector without the pandas extra
+        raise NotImplementedError
+
+    def fetchmany(self, size):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+def connect_from_env():
+    import snowflake.connector
+
+    return snowflake.connector.connect(
+        user=os.environ["SNOWFLAKE_USER"],
+        password=os.environ["SNOWFLAKE_PASSWORD"],
+        account=os.environ["SNOWFLAKE_ACCOUNT"],
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync SNOWFLAKE.ACCOUNT_USAGE views into a local SQLite store")
+    parser.add_argument("--db", default=DEFAULT_LOCAL_DB, help="Local SQLite database")
+    parser.add_argument("--tables", nargs="+", choices=sorted(SYNC_TABLES), help="Views to sync (default all)")
+    parser.add_argument("--interval", type=float, help="Keep running, syncing every this many seconds")
+    parser.add_argument("--lookback", type=float, default=DEFAULT_LOOKBACK_SECONDS,
+                        help="Seconds before the watermark to re-read for late-arriving rows")
+    parser.add_argument("--replay", help="Directory of <VIEW>.csv fixtures to sync from instead of Snowflake")
+    args = parser.parse_args(argv)
+
+    store = LocalStore(args.db)
+    connect = (lambda: ReplayConnection(args.replay)) if args.replay else connect_from_env
+    while True:
+        started = time.perf_counter()
+        with closing(connect()) as conn:
+            result = sync_all(conn, store, args.tables, args.lookback)
+        summary = ", ".join(f"{table} +{count:,}" for table, count in result.items())
+        print(f"[sync] {summary} in {time.perf_counter() - started:.1f}s", file=sys.stderr, flush=True)
+        if not args.interval:
+            return 0
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,35 +1,13 @@
 # techstacks2toolsv1.py
 import streamlit as st
-import requests
-import json
+
+import gemini_client
+
+TOOL_DESIGN_PROMPT = "Analyze this job description and suggest a Streamlit tool design to accomplish the tasks described: {job_description}"
 
 def process_job_description(api_key, job_description):
     """Process job description using Google Gemini API"""
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
-    
-    headers = {
-        "Content-Type": "application/json"
-    }
-    
-    payload = {
-        "contents": [{
-            "parts": [{
-                "text": f"Analyze this job description and suggest a Streamlit tool design to accomplish the tasks described: {job_description}"
-            }]
-        }]
-    }
-    
-    try:
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
-        response.raise_for_status()
-        
-        # Parse the API response
-        result = response.json()
-        generated_text = result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "No response generated")
-        return generated_text
-    
-    except requests.exceptions.RequestException as e:
-        return f"Error calling API: {str(e)}"
+    return gemini_client.analyze(api_key, TOOL_DESIGN_PROMPT, job_description)
 
 def main():
     # Title and header
@@ -67,6 +45,10 @@ def main():
                     # Display the results
                     st.subheader("Proposed Tool Design")
                     st.write(result)
+
+                    stats = gemini_client.cache_stats()
+                    if stats:
+                        st.caption(f"Analysis cache: {stats['hits']} hits / {stats['misses']} misses")
                     
                 except Exception as e:
                     st.error(f"An error occurred: {str(e)}")
@@ -1,113 +1,33 @@
 # tool_design.py
 import streamlit as st
-import requests
-import json
+from concurrent.futures import ThreadPoolExecutor
 
-def process_job_description(api_key, job_description, detailed_breakdown=False):
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
-    headers = {"Content-Type": "application/json"}
-    
-    if detailed_breakdown:
-        prompt = f"""Analyze this job description and provide a detailed breakdown in the following structured format:
-        - Tools and Tech Stack: [list specific tools/tech mentioned in the job description]
-        - Desired Activities: [list specific activities the employee would perform]
-        - Required Skills: [list specific skills required for the role]
-        Job Description: {job_description}"""
-    else:
-        prompt = f"Analyze this job description and suggest a Streamlit tool design to accomplish the tasks described: {job_description}"
-
-    payload = {
-        "contents": [{
-            "parts": [{"text": prompt}]
-        }]
-    }
-    try:
-        response = requests.post(url, headers=headers, data=json.dumps(payload), timeout=30)
-        response.raise_for_status()
-        result = response.json()
-        return result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "No response generated")
-    except requests.exceptions.Timeout:
-        return "Error: API request timed out"
-    except requests.exceptions.RequestException as e:
-        return f"Error calling API: {str(e)}"
-
-def parse_analysis(result):
-    sections = {
-        "Tools and Tech Stack": [],
-        "Desired Activities": [],
-        "Required Skills": []
-    }
-    current_section = None
-    for line in result.split('\n'):
-        line = line.strip()
-        if line in sections:
-            current_section = line
-        elif current_section and line.startswith('-') and line[1:].strip():
-            sections[current_section].append(line[1:].strip())
-    return sections
-
-def generate_workflow_code(analysis):
-    tools = analysis["Tools and Tech Stack"]
-    activities = analysis["Desired Activities"]
-    skills = analysis["Required Skills"]
-
-    # Base import - only Streamlit is assumed
-    imports = ["import streamlit as st"]
-
-    workflow_steps = [activity.strip() for activity in activities if activity.strip()] or ["General Task"]
-    skills_list = "\n".join(f"- {skill}" for skill in skills if skill) if skills else "No skills identified"
-    skills_markdown = f"""st.markdown('''
-{skills_list}
-''')"""
-
-    main_code = """# daily_workflow.py
-import streamlit as st
-
-def main():
-    st.set_page_config(page_title="Daily Workflow", layout="wide")
-    st.title("Daily Workflow")
-    st.subheader("Custom Workflow Based on Job Description")
-
-    # Available tools from job description
-    TOOLS = """ + json.dumps(tools if tools else []) + """
-
-    # Sidebar for navigation
-    st.sidebar.title("Workflow Steps")
-    step = st.sidebar.radio("Select Activity", """ + json.dumps(workflow_steps) + """)
+import gemini_client
+from workflow_codegen import generate_workflow_code
+from job_analysis import (BREAKDOWN_PROMPT, FUSED_PROMPT, TOOL_DESIGN_PROMPT, parse_analysis,
+                          split_fused_response)
 
-    # Dynamic content based on selected step
-"""
-    for step in workflow_steps:
-        main_code += f"""    if step == "{step}":
-        st.header("{step}")
-        tool = st.selectbox("Select Tool for {step}", TOOLS)
-        task_details = st.text_area("Task Details", "Describe your work with {{tool}} here")
-        if st.button("Execute {step}"):
-            st.success(f"Executed '{step}' using {{tool}}")
-            st.write(f"Output: [Mock result using {{tool}}]")
-"""
-
-    main_code += """
-    # Collaboration section
-    with st.expander("Collaboration"):
-        report_content = st.text_area("Report Content", "Daily update...")
-        if st.button("Generate Report"):
-            st.download_button(
-                label="Download Report",
-                data=report_content,
-                file_name="daily_report.txt",
-                mime="text/plain"
-            )
-
-    # Display skills reference
-    with st.expander("Required Skills"):
-        st.write("Skills required for this role:")
-        """ + skills_markdown + """
-
-if __name__ == "__main__":
-    main()
-"""
-    return main_code
+def process_job_description(api_key, job_description, detailed_breakdown=False):
+    prompt = BREAKDOWN_PROMPT if detailed_breakdown else TOOL_DESIGN_PROMPT
+    return gemini_client.analyze(api_key, prompt, job_description)
+
+def process_all(api_key, job_description, fused=False):
+    """Return (breakdown, tool design) using one fused call or two concurrent calls"""
+    if fused:
+        return split_fused_response(gemini_client.analyze(api_key, FUSED_PROMPT, job_description))
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        breakdown = executor.submit(process_job_description, api_key, job_description, True)
+        tool_design = executor.submit(process_job_description, api_key, job_description, False)
+        return breakdown.result(), tool_design.result()
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def cached_parse_analysis(result):
+    """parse_analysis memoized on the raw breakdown text so tab switches skip re-parsing"""
+    return parse_analysis(result)
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def cached_workflow_code(result):
+    return generate_workflow_code(cached_parse_analysis(result))
 
 def main():
     st.set_page_config(page_title="Generic Tool Design Analyzer", layout="wide")
@@ -128,6 +48,8 @@ def main():
             if uploaded_file:
                 job_description = uploaded_file.read().decode("utf-8")
 
+        fused = st.checkbox("Single-call mode", help="Ask for the breakdown and tool design in one fused prompt instead of two parallel calls")
+
     # Process button outside tabs
     if st.button("Process Job Description"):
         if not api_key or not job_description:
@@ -135,16 +57,20 @@ def main():
         else:
             with st.spinner("Processing job description..."):
                 # Store results in session state to share across tabs
-                st.session_state.breakdown_result = process_job_description(api_key, job_description, detailed_breakdown=True)
-                st.session_state.tool_design_result = process_job_description(api_key, job_description, detailed_breakdown=False)
+                st.session_state.breakdown_result, st.session_state.tool_design_result = process_all(api_key, job_description, fused=fused)
                 st.success("Job description processed successfully!")
 
+    stats = gemini_client.cache_stats()
+    if stats:
+        st.caption(f"Analysis cache: {stats['hits']} hits / {stats['misses']} misses "
+                   f"({stats['entries']} stored, {stats['size_bytes'] / 1024:.0f} KB)")
+
     # Tabs for displaying results
     if "breakdown_result" in st.session_state and "tool_design_result" in st.session_state:
         tab1, tab2, tab3, tab4 = st.tabs(["Tools and Tech Stack", "Desired Activities", "Required Skills", "Proposed Tool Design"])
         
         # Breakdown tabs
-        analysis = parse_analysis(st.session_state.breakdown_result)
+        analysis = cached_parse_analysis(st.session_state.breakdown_result)
         
         with tab1:
             st.markdown("\n".join(f"- {item}" for item in analysis["Tools and Tech Stack"]) or "No tools identified")
@@ -167,7 +93,7 @@ def main():
             )
             
             # Generate and download daily_workflow.py
-            workflow_code = generate_workflow_code(analysis)
+            workflow_code = cached_workflow_code(st.session_state.breakdown_result)
             if st.button("Generate Daily Workflow"):
                 st.code(workflow_code, language="python")
                 st.download_button(
@@ -0,0 +1,180 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from snowflake_sync import (SYNC_TABLES, LocalStore, ReplayConnection, ReplayCursor, _sql_value, sync_all,
+                            sync_table)
+
+QUERY_HISTORY = [
+    ("q1", "ALICE", "SELECT 1", "WH_XS", "X-Small", 100, "2024-05-01 10:00:00"),
+    ("q2", "BOB", "SELECT 2", "WH_XS", "X-Small", 200, "2024-05-01 11:00:00"),
+    ("q3", "ALICE", "SELECT 3", "WH_M", "Medium", 300, "2024-05-01 12:00:00"),
+]
+
+
+def write_fixture(directory, table, rows):
+    pd.DataFrame(rows, columns=[column.upper() for column in SYNC_TABLES[table]["columns"]]).to_csv(
+        directory / f"{table}.csv", index=False)
+
+
+def read_table(store, table, order_by):
+    return store.read_sql(f"SELECT * FROM {table} ORDER BY {order_by}")
+
+
+@pytest.fixture
+def fixtures(tmp_path):
+    directory = tmp_path / "fixtures"
+    directory.mkdir()
+    write_fixture(directory, "QUERY_HISTORY", QUERY_HISTORY)
+    write_fixture(directory, "WAREHOUSE_LOAD_HISTORY", [
+        ("WH_XS", "2024-05-01 10:00:00", 40.0, 12, 0.5),
+        ("WH_M", "2024-05-01 10:00:00", 75.0, 30, 2.0),
+    ])
+    write_fixture(directory, "POLICY_REFERENCES", [
+        ("CUSTOMERS", "MASK_EMAIL", "MASKING_POLICY"),
+        ("ORDERS", "ROW_REGION", "ROW_ACCESS_POLICY"),
+    ])
+    write_fixture(directory, "GRANTS_TO_ROLES", [
+        ("ANALYST", "ROLE", "SELECT"),
+        ("SYSADMIN", "ROLE", "OWNERSHIP"),
+    ])
+    return directory
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LocalStore(str(tmp_path / "account_usage.db"))
+    yield store
+    store.close()
+
+
+def test_sync_all_copies_every_view(fixtures, store):
+    result = sync_all(ReplayConnection(str(fixtures)), store)
+
+    assert result == {"QUERY_HISTORY": 3, "WAREHOUSE_LOAD_HISTORY": 2, "POLICY_REFERENCES": 2, "GRANTS_TO_ROLES": 2}
+    for table, count in result.items():
+        watermark, synced_at, row_count = store.state(table)
+        assert row_count == count
+        assert synced_at is not None
+        assert (watermark is None) == (SYNC_TABLES[table]["watermark"] is None)
+
+
+def test_watermark_advances_and_only_new_rows_are_fetched(fixtures, store):
+    connection = ReplayConnection(str(fixtures))
+    assert sync_table(connection, store, "QUERY_HISTORY", lookback_seconds=0) == 3
+    assert store.state("QUERY_HISTORY")[0] == "2024-05-01 12:00:00"
+
+    write_fixture(fixtures, "QUERY_HISTORY", QUERY_HISTORY + [
+        ("q4", "CAROL", "SELECT 4", "WH_XS", "X-Small", 400, "2024-05-01 13:00:00"),
+    ])
+    assert sync_table(connection, store, "QUERY_HISTORY", lookback_seconds=0) == 1
+    assert store.state("QUERY_HISTORY")[0] == "2024-05-01 13:00:00"
+    assert read_table(store, "QUERY_HISTORY", "query_id")["query_id"].tolist() == ["q1", "q2", "q3", "q4"]
+
+
+def test_lookback_rereads_late_rows_and_upserts_them(fixtures, store):
+    connection = ReplayConnection(str(fixtures))
+    sync_table(connection, store, "QUERY_HISTORY", lookback_seconds=0)
+
+    # q2 finished late with a new execution time, and q5 landed behind the watermark
+    write_fixture(fixtures, "QUERY_HISTORY", [
+        QUERY_HISTORY[0],
+        ("q2", "BOB", "SELECT 2", "WH_XS", "X-Small", 250, "2024-05-01 11:00:00"),
+        QUERY_HISTORY[2],
+        ("q5", "DAVE", "SELECT 5", "WH_M", "Medium", 500, "2024-05-01 11:30:00"),
+    ])
+    fetched = sync_table(connection, store, "QUERY_HISTORY", lookback_seconds=2 * 3600)
+
+    # Everything after 10:00 is re-read: q2, q5 and q3
+    assert fetched == 3
+    table = read_table(store, "QUERY_HISTORY", "query_id")
+    assert table["query_id"].tolist() == ["q1", "q2", "q3", "q5"]
+    assert table.set_index("query_id").loc["q2", "execution_time"] == 250
+    assert store.state("QUERY_HISTORY")[0] == "2024-05-01 12:00:00"
+    assert store.state("QUERY_HISTORY")[2] == 4
+
+
+def test_watermark_compares_instants_across_offset_changes(fixtures, store):
+    # Clocks went back at 02:00 PDT: the later row has the smaller local time
+    write_fixture(fixtures, "QUERY_HISTORY", [
+        ("q1", "ALICE", "SELECT 1", "WH_XS", "X-Small", 100, "2024-11-03 01:30:00-07:00"),
+        ("q2", "BOB", "SELECT 2", "WH_XS", "X-Small", 200, "2024-11-03 01:15:00-08:00"),
+    ])
+    connection = ReplayConnection(str(fixtures))
+    assert sync_table(connection, store, "QUERY_HISTORY", lookback_seconds=0) == 2
+    assert store.state("QUERY_HISTORY")[0] == "2024-11-03 01:15:00-08:00"
+
+    write_fixture(fixtures, "QUERY_HISTORY", [
+        ("q1", "ALICE", "SELECT 1", "WH_XS", "X-Small", 100, "2024-11-03 01:30:00-07:00"),
+        ("q2", "BOB", "SELECT 2", "WH_XS", "X-Small", 200, "2024-11-03 01:15:00-08:00"),
+        ("q3", "CAROL", "SELECT 3", "WH_XS", "X-Small", 300, "2024-11-03 01:20:00-08:00"),
+    ])
+    assert sync_table(connection, store, "QUERY_HISTORY", lookback_seconds=0) == 1
+    assert store.state("QUERY_HISTORY")[0] == "2024-11-03 01:20:00-08:00"
+
+
+def test_zoned_timestamps_are_stored_in_utc():
+    assert _sql_value(pd.Timestamp("2024-11-03 01:15:00-08:00")) == "2024-11-03 09:15:00+00:00"
+    assert _sql_value(pd.Timestamp("2024-05-01 10:00:00")) == "2024-05-01 10:00:00"
+
+
+def test_snapshot_views_are_replaced(fixtures, store):
+    connection = ReplayConnection(str(fixtures))
+    sync_table(connection, store, "POLICY_REFERENCES")
+
+    write_fixture(fixtures, "POLICY_REFERENCES", [
+        ("ORDERS", "ROW_REGION", "ROW_ACCESS_POLICY"),
+        ("PAYMENTS", "MASK_CARD", "MASKING_POLICY"),
+    ])
+    assert sync_table(connection, store, "POLICY_REFERENCES") == 2
+
+    table = read_table(store, "POLICY_REFERENCES", "table_name")
+    assert table["table_name"].tolist() == ["ORDERS", "PAYMENTS"]
+    assert store.state("POLICY_REFERENCES")[2] == 2
+
+
+class FlakyCursor(ReplayCursor):
+    """Replay cursor whose connection drops before the last batch has been read"""
+
+    def fetchmany(self, size):
+        if not self._rows:
+            raise ConnectionError("connection reset by peer")
+        return super().fetchmany(2)
+
+
+class FlakyConnection(ReplayConnection):
+    def cursor(self):
+        return FlakyCursor(self.fixtures)
+
+
+def test_interrupted_sync_keeps_previous_copy_and_resumes(fixtures, store):
+    sync_table(ReplayConnection(str(fixtures)), store, "QUERY_HISTORY", lookback_seconds=0)
+    write_fixture(fixtures, "QUERY_HISTORY", QUERY_HISTORY + [
+        ("q4", "CAROL", "SELECT 4", "WH_XS", "X-Small", 400, "2024-05-01 13:00:00"),
+        ("q5", "DAVE", "SELECT 5", "WH_M", "Medium", 500, "2024-05-01 14:00:00"),
+        ("q6", "ERIN", "SELECT 6", "WH_M", "Medium", 600, "2024-05-01 15:00:00"),
+    ])
+
+    with pytest.raises(ConnectionError):
+        sync_table(FlakyConnection(str(fixtures)), store, "QUERY_HISTORY", lookback_seconds=0)
+    # The partial batch was rolled back with the transaction
+    assert store.state("QUERY_HISTORY")[0] == "2024-05-01 12:00:00"
+    assert len(read_table(store, "QUERY_HISTORY", "query_id")) == 3
+
+    assert sync_table(ReplayConnection(str(fixtures)), store, "QUERY_HISTORY", lookback_seconds=0) == 3
+    assert store.state("QUERY_HISTORY")[0] == "2024-05-01 15:00:00"
+    assert read_table(store, "QUERY_HISTORY", "query_id")["query_id"].tolist() == ["q1", "q2", "q3", "q4", "q5", "q6"]
+
+
+def test_reads_do_not_wait_for_a_sync_in_progress(fixtures, store):
+    sync_table(ReplayConnection(str(fixtures)), store, "QUERY_HISTORY")
+    with store.transaction() as local:
+        local.execute("DELETE FROM QUERY_HISTORY")
+        result = {}
+        reader = threading.Thread(target=lambda: result.update(rows=len(read_table(store, "QUERY_HISTORY", "query_id"))))
+        reader.start()
+        reader.join(timeout=5)
+        assert not reader.is_alive()
+    # The reader saw the last committed copy, not the uncommitted delete
+    assert result["rows"] == 3
@@ -0,0 +1,104 @@
+# workflow_codegen.py
+import io
+import zipfile
+from string import Template
+
+# Templates are parsed once at import; every value substituted into them is a
+# Python literal produced by repr(), so quotes, braces and backslashes in the
+# analysis can never break the generated code.
+APP_TEMPLATE = Template('''# daily_workflow.py
+import streamlit as st
+
+def main():
+    st.set_page_config(page_title="Daily Workflow", layout="wide")
+    st.title("Daily Workflow")
+    st.subheader("Custom Workflow Based on Job Description")
+
+    # Available tools from job description
+    TOOLS = $tools
+
+    # Sidebar for navigation
+    st.sidebar.title("Workflow Steps")
+    step = st.sidebar.radio("Select Activity", $steps)
+
+    # Dynamic content based on selected step
+$step_blocks
+    # Collaboration section
+    with st.expander("Collaboration"):
+        report_content = st.text_area("Report Content", "Daily update...")
+        if st.button("Generate Report"):
+            st.download_button(
+                label="Download Report",
+                data=report_content,
+                file_name="daily_report.txt",
+                mime="text/plain"
+            )
+
+    # Display skills reference
+    with st.expander("Required Skills"):
+        st.write("Skills required for this role:")
+        st.markdown($skills_markdown)
+
+if __name__ == "__main__":
+    main()
+''')
+
+STEP_TEMPLATE = Template('''    if step == $step:
+        st.header($step)
+        tool = st.selectbox($select_label, TOOLS)
+        task_details = st.text_area("Task Details", "Describe your work with {tool} here")
+        if st.button($execute_label):
+            st.success($executed_message + f" using {tool}")
+            st.write(f"Output: [Mock result using {tool}]")
+''')
+
+
+def generate_workflow_code(analysis, validate=True):
+    tools = analysis["Tools and Tech Stack"]
+    activities = analysis["Desired Activities"]
+    skills = analysis["Required Skills"]
+
+    workflow_steps = [activity.strip() for activity in activities if activity.strip()] or ["General Task"]
+    skills_list = "\n".join(f"- {skill}" for skill in skills if skill) if skills else "No skills identified"
+
+    step_blocks = "".join(
+        STEP_TEMPLATE.substitute(
+            step=repr(step),
+            select_label=repr(f"Select Tool for {step}"),
+            execute_label=repr(f"Execute {step}"),
+            executed_message=repr(f"Executed '{step}'"),
+        )
+        for step in workflow_steps
+    )
+    code = APP_TEMPLATE.substitute(
+        tools=repr(list(tools or [])),
+        steps=repr(workflow_steps),
+        step_blocks=step_blocks,
+        skills_markdown=repr(f"\n{skills_list}\n"),
+    )
+    if validate:
+        # Fail here rather than hand the user a daily_workflow.py that does not run
+        compile(code, "daily_workflow.py", "exec")
+    return code
+
+
+def write_workflow_bundle(named_analyses, target, validate=True):
+    """Write one daily_workflow.py per (name, analysis) into a zip file or file object
+
+    Apps are generated and written one at a time, so the number of analyses is not
+    limited by memory.
+    """
+    count = 0
+    with zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+        for name, analysis in named_analyses:
+            bundle.writestr(f"{name}/daily_workflow.py", generate_workflow_code(analysis, validate))
+            count += 1
+    return count
+
+
+def generate_workflow_bundle(analyses, validate=True):
+    """Zip of workflow apps for many analyses; returns the archive bytes"""
+    buffer = io.BytesIO()
+    write_workflow_bundle(((f"workflow_{i:04d}", analysis) for i, analysis in enumerate(analyses, 1)), buffer,
+                          validate)
+    return buffer.getvalue()